@@ -0,0 +1,234 @@
+# Load test of the AI chat path against the local OpenAI stand-in.
+#
+# Synthetic mention messages are fed to AIChat.handle_message (the handler
+# the message dispatcher calls) at a fixed rate from many members across
+# several guilds. Replies go to fake Discord objects with a configurable API
+# latency. Reports end-to-end latency, time to the first visible reply,
+# throughput and event loop lag.
+#
+#   python benchmarks/ai_chat_load.py --rate 20 --duration 30 --concurrency 8
+#   python benchmarks/ai_chat_load.py --api-base http://127.0.0.1:8765/v1  # already running mock
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import config
+from benchmarks.mock_openai import add_arguments
+from cogs.ai_chat import QUEUE_FULL, QUEUE_NOTICE
+
+BOT_ID = 1000
+
+class Typing:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+class FakeSentMessage:
+    def __init__(self, request):
+        self.request = request
+
+    async def edit(self, content):
+        await asyncio.sleep(self.request.harness.discord_latency)
+
+# One synthetic mention, records when its replies went out
+class FakeMessage:
+    def __init__(self, harness, guild_id, channel_id, user_id, prompt):
+        self.harness = harness
+        self.content = f"<@{BOT_ID}> {prompt}"
+        self.guild = SimpleNamespace(id=guild_id)
+        self.channel = SimpleNamespace(id=channel_id, typing=Typing)
+        self.author = SimpleNamespace(id=user_id)
+        self.start = None
+        self.first_reply = None
+        self.outcome = "ok"
+
+    async def reply(self, content):
+        await asyncio.sleep(self.harness.discord_latency)
+        if content.startswith(QUEUE_NOTICE):
+            self.harness.queue_notices += 1
+        else:
+            if content.startswith("❌"):
+                self.outcome = "error"
+            elif content == QUEUE_FULL:
+                self.outcome = "shed"
+            if self.first_reply is None:
+                self.first_reply = time.perf_counter()
+        return FakeSentMessage(self)
+
+class Harness:
+    def __init__(self, discord_latency):
+        self.discord_latency = discord_latency
+        self.queue_notices = 0
+
+def percentiles(values):
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    values = sorted(values)
+    pick = lambda fraction: values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))] * 1000
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": values[-1] * 1000}
+
+async def measure_loop_lag(lags, stop, interval=0.05):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - start - interval))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_mock(args):
+    port = free_port()
+    command = [
+        sys.executable, os.path.join(ROOT, "benchmarks", "mock_openai.py"), "--port", str(port),
+        "--latency", str(args.latency), "--jitter", str(args.jitter), "--tokens", str(args.tokens),
+        "--token-delay", str(args.token_delay), "--error-rate", str(args.error_rate),
+        "--error-status", ",".join(map(str, args.error_status))
+    ]
+    process = subprocess.Popen(command)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"http://127.0.0.1:{port}/v1"
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Mock server didn't start")
+
+async def run(args, api_base):
+    import openai
+    from cogs.ai_chat import AIChat
+    from utils.database import GuildConfig
+
+    cog = AIChat(SimpleNamespace(user=SimpleNamespace(id=BOT_ID)))
+    openai.api_key = "mock"
+    openai.api_base = api_base
+
+    guild_configs = {
+        guild_id: GuildConfig(guild_id, ai_channel=1, ai_cache=int(args.cache))
+        for guild_id in range(1, args.guilds + 1)
+    }
+    prompts = [f"Synthetic question number {i}?" for i in range(args.prompts)]
+    harness = Harness(args.discord_latency)
+
+    lags = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(measure_loop_lag(lags, stop))
+
+    async def send(message):
+        message.start = time.perf_counter()
+        await cog.handle_message(message, guild_configs[message.guild.id])
+        message.done = time.perf_counter()
+
+    total = int(args.rate * args.duration)
+    messages = []
+    tasks = []
+    start = time.perf_counter()
+    for i in range(total):
+        # Open loop, messages keep arriving however slow the replies are
+        delay = start + i / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        guild_id = random.randint(1, args.guilds)
+        message = FakeMessage(
+            harness, guild_id, guild_id * 100 + random.randrange(3),
+            random.randrange(args.users), random.choice(prompts)
+        )
+        messages.append(message)
+        tasks.append(asyncio.create_task(send(message)))
+
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    ok = [m for m in messages if m.outcome == "ok"]
+    outcomes = {}
+    for message in messages:
+        outcomes[message.outcome] = outcomes.get(message.outcome, 0) + 1
+
+    return {
+        "settings": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "api_base")
+        },
+        "sent": total,
+        "outcomes": outcomes,
+        "queue_notices": harness.queue_notices,
+        "wall_seconds": wall,
+        "throughput_per_s": len(ok) / wall,
+        "latency": percentiles([m.done - m.start for m in ok]),
+        "first_reply": percentiles([m.first_reply - m.start for m in ok if m.first_reply]),
+        "loop_lag": percentiles(lags),
+        "cog": cog.stats()
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=10, help="messages per second")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--prompts", type=int, default=50, help="distinct prompts, fewer means more cache hits")
+    parser.add_argument("--concurrency", type=int, default=config.AI_CONCURRENCY)
+    parser.add_argument("--queue", type=int, default=config.AI_QUEUE_SIZE)
+    parser.add_argument("--stream", action=argparse.BooleanOptionalAction, default=config.AI_STREAMING)
+    parser.add_argument("--cache", action="store_true", help="enable the response cache in every guild")
+    parser.add_argument("--discord-latency", type=float, default=0.05, help="seconds per fake send or edit")
+    parser.add_argument("--api-base", help="use an already running mock instead of starting one")
+    parser.add_argument("--output", help="write the results as JSON")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    # The harness is one client, lift the per-member limit
+    config.AI_RATE_LIMIT = 10 ** 9
+    config.AI_CONCURRENCY = args.concurrency
+    config.AI_QUEUE_SIZE = args.queue
+    config.AI_STREAMING = args.stream
+
+    process = None
+    api_base = args.api_base
+    if not api_base:
+        process, api_base = start_mock(args)
+    try:
+        result = asyncio.run(run(args, api_base))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    print(f"sent {result['sent']} in {result['wall_seconds']:.1f}s, outcomes {result['outcomes']}, "
+          f"{result['queue_notices']} queue notices")
+    print(f"throughput {result['throughput_per_s']:.1f} replies/s")
+    print(f"  {'':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name in ("latency", "first_reply", "loop_lag"):
+        row = result[name]
+        if row["p50_ms"] is None:
+            continue
+        print(f"  {name:<12} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}")
+    print(f"scheduler {result['cog']['scheduler']}")
+    print(f"cache {result['cog']['response_cache']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# Encode time and size of every card output profile on the shipped templates.
+#
+#   python benchmarks/card_encoding.py [--repeat N]
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from PIL import Image
+import config
+from utils.image_generator import OUTPUT_PROFILES, encode_card
+
+def bench(image, profile, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = encode_card(image, profile)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], len(data)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for path in (config.LEVEL_CARD, config.RANK_CARD):
+        with Image.open(path) as image:
+            image = image.copy()
+
+        print(f"{path} ({image.width}x{image.height}, {image.mode})")
+        print(f"  {'profile':<15} {'median ms':>10} {'bytes':>10} {'vs png':>8}")
+        baseline = None
+        for profile in OUTPUT_PROFILES:
+            seconds, size = bench(image, profile, args.repeat)
+            baseline = baseline or size
+            print(f"  {profile:<15} {seconds * 1000:>10.2f} {size:>10,} {size / baseline:>7.0%}")
+        print()
+
+if __name__ == "__main__":
+    main()
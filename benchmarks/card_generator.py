@@ -0,0 +1,218 @@
+# Latency, throughput and memory benchmark for utils.image_generator.CardGenerator.
+#
+# Each card type runs in its own child process so peak RSS (including render
+# workers) is measured per type. Results are written as JSON, and passing an
+# earlier result as --baseline reports regressions and exits with status 1.
+#
+#   python benchmarks/card_generator.py --output before.json
+#   python benchmarks/card_generator.py --output after.json --baseline before.json
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+CARDS = ("levelup", "rank")
+
+class FakeAvatar:
+    def __init__(self, key, data):
+        self.key = key
+        self._data = data
+
+    def with_size(self, size):
+        return self
+
+    async def read(self):
+        return self._data
+
+class FakeUser:
+    def __init__(self, user_id, avatar_bytes):
+        self.id = user_id
+        self.display_name = f"Benchmark User {user_id}"
+        self.mention = f"<@{user_id}>"
+        self.display_avatar = FakeAvatar(f"bench{user_id}", avatar_bytes)
+
+def synthetic_avatar(seed, size=128):
+    from PIL import Image
+    rng = random.Random(seed)
+    image = Image.effect_noise((size, size), 64).convert("RGB")
+    tint = Image.new("RGB", (size, size), tuple(rng.randrange(256) for _ in range(3)))
+    buffer = BytesIO()
+    Image.blend(image, tint, 0.6).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def peak_rss_kb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1024 if sys.platform == "darwin" else 1
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+    return own, children
+
+async def run_card(card, iterations, concurrency_levels, users):
+    from utils.image_generator import CardGenerator
+
+    gen = CardGenerator()
+    gen.cards.max_bytes = 0  # Measure rendering, not the card cache
+    counter = iter(range(10 ** 9))
+
+    async def one_call():
+        n = next(counter)
+        user = users[n % len(users)]
+        # Vary the inputs so every call renders a new card
+        start = time.perf_counter()
+        if card == "levelup":
+            await gen.generate_level_up_card(user, 4, 5, n % 2500, 2500)
+        else:
+            await gen.generate_rank_card(user, n % 2500, 5, 2500, n + 1)
+        return time.perf_counter() - start
+
+    # Warm up the pool and the avatar cache
+    await asyncio.gather(*(one_call() for _ in range(max(concurrency_levels) * 2)))
+
+    results = []
+    for concurrency in concurrency_levels:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited():
+            async with semaphore:
+                return await one_call()
+
+        start = time.perf_counter()
+        latencies = sorted(await asyncio.gather(*(limited() for _ in range(iterations))))
+        wall = time.perf_counter() - start
+
+        results.append({
+            "concurrency": concurrency,
+            "iterations": iterations,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "throughput_per_s": iterations / wall
+        })
+
+    mode = gen.pool.mode
+    # Wait for the workers to exit so their peak RSS is counted
+    if gen.pool._executor is not None:
+        gen.pool._executor.shutdown(wait=True)
+    gen.close()
+    own, children = peak_rss_kb()
+    return {
+        "card": card,
+        "render_mode": mode,
+        "peak_rss_kb": own,
+        "peak_worker_rss_kb": children,
+        "runs": results
+    }
+
+def child_main(args):
+    import config
+    config.AVATAR_CACHE_DIR = None
+    config.RENDER_USE_PROCESSES = not args.threads
+    if args.workers:
+        config.RENDER_WORKERS = args.workers
+
+    users = [FakeUser(i, synthetic_avatar(i)) for i in range(args.users)]
+    result = asyncio.run(run_card(args.child, args.iterations, args.concurrency, users))
+    json.dump(result, sys.stdout)
+
+def compare(current, baseline, tolerance):
+    regressions = []
+    old_runs = {
+        (card["card"], run["concurrency"]): run
+        for card in baseline["cards"] for run in card["runs"]
+    }
+    for card in current["cards"]:
+        for run in card["runs"]:
+            old = old_runs.get((card["card"], run["concurrency"]))
+            if not old:
+                continue
+            for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                if run[metric] > old[metric] * (1 + tolerance):
+                    regressions.append(f"{card['card']} c={run['concurrency']} {metric}: {old[metric]:.2f} -> {run[metric]:.2f}")
+            if run["throughput_per_s"] < old["throughput_per_s"] * (1 - tolerance):
+                regressions.append(
+                    f"{card['card']} c={run['concurrency']} throughput: "
+                    f"{old['throughput_per_s']:.1f} -> {run['throughput_per_s']:.1f}/s"
+                )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200, help="renders per concurrency level")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 4, 16])
+    parser.add_argument("--users", type=int, default=50, help="distinct fake users and avatars")
+    parser.add_argument("--workers", type=int, help="override RENDER_WORKERS")
+    parser.add_argument("--threads", action="store_true", help="render on threads instead of processes")
+    parser.add_argument("--cards", default=",".join(CARDS))
+    parser.add_argument("--output", default="card_generator_bench.json")
+    parser.add_argument("--baseline", help="earlier result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging")
+    parser.add_argument("--child", choices=CARDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child_main(args)
+
+    forwarded = [
+        "--iterations", str(args.iterations),
+        "--concurrency", ",".join(map(str, args.concurrency)),
+        "--users", str(args.users)
+    ]
+    if args.workers:
+        forwarded += ["--workers", str(args.workers)]
+    if args.threads:
+        forwarded.append("--threads")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "cards": []
+    }
+    for card in args.cards.split(","):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", card, *forwarded],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output)
+        report["cards"].append(result)
+
+        print(f"{card} ({result['render_mode']} pool, peak RSS {result['peak_rss_kb'] / 1024:.0f} MiB"
+              f" + workers {result['peak_worker_rss_kb'] / 1024:.0f} MiB)")
+        print(f"  {'conc':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cards/s':>8}")
+        for run in result["runs"]:
+            print(f"  {run['concurrency']:>4} {run['p50_ms']:>8.2f} {run['p95_ms']:>8.2f} "
+                  f"{run['p99_ms']:>8.2f} {run['throughput_per_s']:>8.1f}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Before/after timing of drawing cards on the pre-composed base layers.
+#
+# "before" copies the bare template and draws the static parts on every
+# render, "after" copies the base layer that already contains them. PNG
+# encoding is timed separately since it is the same for both.
+#
+#   python benchmarks/card_layers.py [--repeat N]
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from utils.image_generator import (
+    CardAssets, draw_level_up, draw_level_up_static, draw_rank, draw_rank_static, encode_card
+)
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    assets = CardAssets()
+    fonts = assets.fonts
+
+    def level_before():
+        image = assets.level_template.copy()
+        draw_level_up_static(image, fonts)
+        draw_level_up(image, fonts, "Benchmark User", 4, 5, 1234, 2500)
+        return image
+
+    def level_after():
+        image = assets.level_base.copy()
+        draw_level_up(image, fonts, "Benchmark User", 4, 5, 1234, 2500)
+        return image
+
+    def rank_before():
+        image = assets.rank_template.copy()
+        draw_rank_static(image, fonts)
+        draw_rank(image, fonts, 1234, 5, 2500, 42)
+        return image
+
+    def rank_after():
+        image = assets.rank_base.copy()
+        draw_rank(image, fonts, 1234, 5, 2500, 42)
+        return image
+
+    print(f"{'card':<8} {'before ms':>10} {'after ms':>10} {'saved':>7} {'encode ms':>10}")
+    for name, before, after in (("levelup", level_before, level_after), ("rank", rank_before, rank_after)):
+        before_ms = median_ms(before, args.repeat)
+        after_ms = median_ms(after, args.repeat)
+        image = after()
+        encode_ms = median_ms(lambda: encode_card(image), max(1, args.repeat // 10))
+        print(f"{name:<8} {before_ms:>10.3f} {after_ms:>10.3f} {1 - after_ms / before_ms:>7.0%} {encode_ms:>10.2f}")
+
+if __name__ == "__main__":
+    main()
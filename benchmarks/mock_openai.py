@@ -0,0 +1,109 @@
+# Local stand-in for the OpenAI chat completions endpoint, so the AI chat
+# path can be load tested without spending credits. Supports streamed and
+# plain responses, configurable latency and injected errors.
+#
+#   python benchmarks/mock_openai.py --port 8765 --latency 0.5 --error-rate 0.05
+#
+# then point openai.api_base at http://127.0.0.1:8765/v1
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from aiohttp import web
+
+WORDS = "the quick brown fox jumps over the lazy dog while the bot keeps answering".split()
+
+def completion_id():
+    return f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+def reply_words(count):
+    return [random.choice(WORDS) for _ in range(count)]
+
+async def chat_completions(request):
+    options = request.app["options"]
+    body = await request.json()
+
+    # Time until the first token
+    await asyncio.sleep(max(0.0, random.gauss(options.latency, options.jitter)))
+
+    if random.random() < options.error_rate:
+        status = random.choice(options.error_status)
+        return web.json_response(
+            {"error": {"message": "Injected error", "type": "server_error", "code": None}},
+            status=status
+        )
+
+    words = reply_words(options.tokens)
+    model = body.get("model", "gpt-3.5-turbo")
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(options.token_delay * len(words))
+        return web.json_response({
+            "id": completion_id(),
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)}
+        })
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    chunk_id = completion_id()
+
+    async def send(delta, finish_reason=None):
+        chunk = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+    await send({"role": "assistant"})
+    for i, word in enumerate(words):
+        await send({"content": word if i == 0 else " " + word})
+        await asyncio.sleep(options.token_delay)
+    await send({}, finish_reason="stop")
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+def make_app(options):
+    app = web.Application()
+    app["options"] = options
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.5, help="mean seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.1, help="standard deviation of the latency")
+    parser.add_argument("--tokens", type=int, default=60, help="words per reply")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed words")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument(
+        "--error-status", type=lambda s: [int(c) for c in s.split(",")], default=[429, 500, 503],
+        help="statuses picked from for injected errors"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    options = parser.parse_args()
+
+    web.run_app(make_app(options), host=options.host, port=options.port, print=None)
+
+if __name__ == "__main__":
+    main()
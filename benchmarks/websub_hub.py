@@ -0,0 +1,201 @@
+# Local stand-in for YouTube's WebSub hub, so push notifications can be
+# tried end to end without a public callback URL. Subscriptions are verified
+# with a challenge like the real hub does, and anything POSTed to /publish
+# is signed with each subscriber's secret and pushed to them.
+#
+#   python benchmarks/websub_hub.py --port 8766 --lease 300
+#   curl --data-binary @feed.xml "http://127.0.0.1:8766/publish?topic=<topic url>"
+#
+# then set YT_WEBSUB_HUB to http://127.0.0.1:8766/subscribe. --demo runs the
+# hub and a WebSubReceiver in one process and walks through a subscription,
+# a signed and a forged notification and a lease running out.
+
+import argparse
+import asyncio
+import os
+import secrets
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.websub import TOPIC_URL, WebSubReceiver, sign
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">
+ <link rel="hub" href="https://pubsubhubbub.appspot.com"/>
+ <title>YouTube video feed</title>
+ <entry>
+  <id>yt:video:{video_id}</id>
+  <yt:videoId>{video_id}</yt:videoId>
+  <yt:channelId>{channel_id}</yt:channelId>
+  <title>Demo upload</title>
+  <link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>
+  <author><name>Demo channel</name></author>
+  <published>2026-01-01T12:00:00+00:00</published>
+  <updated>2026-01-01T12:00:00+00:00</updated>
+ </entry>
+</feed>
+"""
+
+class Hub:
+    def __init__(self, lease_seconds):
+        self.lease_seconds = lease_seconds
+        self.subscribers = {}  # (topic, callback) -> (secret, expires)
+        self.session = None
+        self._tasks = set()
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_post("/subscribe", self.handle_subscribe)
+        app.router.add_post("/publish", self.handle_publish)
+        app.on_startup.append(self._open)
+        app.on_cleanup.append(self._close)
+        return app
+
+    async def _open(self, app):
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+
+    async def _close(self, app):
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.session.close()
+
+    async def handle_subscribe(self, request):
+        form = await request.post()
+        mode = form.get("hub.mode")
+        topic = form.get("hub.topic")
+        callback = form.get("hub.callback")
+        if mode not in ("subscribe", "unsubscribe") or not topic or not callback:
+            return web.Response(status=400, text="hub.mode, hub.topic and hub.callback are required")
+
+        lease_seconds = min(int(form.get("hub.lease_seconds") or self.lease_seconds), self.lease_seconds)
+        # Verified after answering, like the real hub
+        task = asyncio.create_task(self._verify(mode, topic, callback, form.get("hub.secret"), lease_seconds))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response(status=202)
+
+    async def _verify(self, mode, topic, callback, secret, lease_seconds):
+        challenge = secrets.token_hex(16)
+        params = {"hub.mode": mode, "hub.topic": topic, "hub.challenge": challenge, "hub.lease_seconds": lease_seconds}
+        try:
+            async with self.session.get(callback, params=params) as response:
+                confirmed = response.status == 200 and await response.text() == challenge
+        except aiohttp.ClientError as e:
+            print(f"hub: verifying {callback} failed: {e}")
+            return
+
+        print(f"hub: {mode} {topic} -> {callback} {'confirmed' if confirmed else 'not confirmed'}")
+        if not confirmed:
+            return
+        if mode == "subscribe":
+            self.subscribers[(topic, callback)] = (secret, time.time() + lease_seconds)
+        else:
+            self.subscribers.pop((topic, callback), None)
+
+    async def handle_publish(self, request):
+        topic = request.query.get("topic")
+        body = await request.read()
+        now = time.time()
+
+        delivered = 0
+        for (subscribed_topic, callback), (secret, expires) in list(self.subscribers.items()):
+            if subscribed_topic != topic:
+                continue
+            if expires <= now:
+                del self.subscribers[(subscribed_topic, callback)]
+                continue
+            headers = {"Content-Type": "application/atom+xml"}
+            if secret:
+                headers["X-Hub-Signature"] = sign(secret, body)
+            async with self.session.post(callback, data=body, headers=headers) as response:
+                print(f"hub: pushed {topic} to {callback}: {response.status}")
+            delivered += 1
+        return web.json_response({"delivered": delivered})
+
+async def demo(options):
+    # Hub and receiver on local ports, checking each step of the protocol
+    hub = Hub(options.lease)
+    hub_runner = web.AppRunner(hub.make_app())
+    await hub_runner.setup()
+    await web.TCPSite(hub_runner, "127.0.0.1", options.port).start()
+
+    received = []
+
+    async def on_feed(feed):
+        received.append(feed)
+
+    session = aiohttp.ClientSession()
+    receiver = WebSubReceiver(
+        session,
+        f"http://127.0.0.1:{options.port}/subscribe",
+        f"http://127.0.0.1:{options.port + 1}/websub",
+        "demo-secret",
+        on_feed,
+        lease_seconds=options.lease,
+        retry_after=options.lease
+    )
+    await receiver.start("127.0.0.1", options.port + 1)
+
+    channel_id = "UCdemo"
+    topic = TOPIC_URL.format(channel_id)
+    publish = f"http://127.0.0.1:{options.port}/publish"
+    body = FEED.format(video_id="demo1", channel_id=channel_id).encode()
+    failures = 0
+
+    def check(label, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {label}")
+
+    try:
+        await receiver.subscribe(channel_id)
+        for _ in range(50):
+            if receiver.active(channel_id):
+                break
+            await asyncio.sleep(0.05)
+        check("subscription verified", receiver.active(channel_id))
+
+        async with session.post(publish, params={"topic": topic}, data=body) as response:
+            await response.read()
+        await asyncio.sleep(0.1)
+        check("signed notification delivered", [feed.entries[0].video_id for feed in received] == ["demo1"])
+
+        forged = {"X-Hub-Signature": sign("wrong-secret", body)}
+        async with session.post(receiver.callback_url, data=body, headers=forged) as response:
+            check("forged notification answered 2xx", response.status // 100 == 2)
+        await asyncio.sleep(0.1)
+        check("forged notification dropped", len(received) == 1 and receiver.rejected == 1)
+
+        challenge = {"hub.mode": "subscribe", "hub.topic": TOPIC_URL.format("UCother"), "hub.challenge": "x"}
+        async with session.get(receiver.callback_url, params=challenge) as response:
+            check("unrequested subscription refused", response.status == 404)
+
+        print(f"waiting {options.lease}s for the lease to run out")
+        await asyncio.sleep(options.lease + 0.5)
+        check("lease expired", not receiver.active(channel_id) and receiver.needs_renewal(channel_id))
+        print(receiver.stats())
+    finally:
+        await receiver.close()
+        await session.close()
+        await hub_runner.cleanup()
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--lease", type=int, default=300, help="longest lease granted, in seconds")
+    parser.add_argument("--demo", action="store_true", help="run the hub against a local receiver and exit")
+    options = parser.parse_args()
+
+    if options.demo:
+        sys.exit(1 if asyncio.run(demo(options)) else 0)
+    web.run_app(Hub(options.lease).make_app(), host=options.host, port=options.port, print=None)
+
+if __name__ == "__main__":
+    main()
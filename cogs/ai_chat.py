@@ -2,17 +2,57 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import config
-from utils.database import get_guild_config, update_guild_config
+from utils.database import update_guild_config
+from utils.dispatcher import dispatcher
 import openai
 import asyncio
-from collections import defaultdict
+from utils.ratelimit import RateLimiter, member_key
+from utils.conversations import ConversationStore
+from utils.streaming import StreamingReply
+from utils.response_cache import ResponseCache, normalize_prompt
+from utils.ai_scheduler import AIScheduler, SchedulerFull
+
+# Replies about the request queue, benchmarks/ai_chat_load.py tells them
+# apart from answers by these
+QUEUE_NOTICE = "⏳ You're about #"
+QUEUE_FULL = "⏳ I'm answering too many questions right now. Please try again in a minute."
+
+def is_retryable(error):
+    # Rate limits, server errors and dropped connections are worth another try
+    if isinstance(error, (openai.error.Timeout, openai.error.APIConnectionError)):
+        return True
+    status = getattr(error, "http_status", None)
+    return status is not None and (status == 429 or status >= 500)
 
 class AIChat(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         openai.api_key = config.OPENAI_KEY
-        self.rate_limits = defaultdict(int)
-        self.active_chats = set()
+        self.rate_limits = RateLimiter(
+            config.AI_RATE_LIMIT, config.AI_RATE_PERIOD,
+            max_keys=config.RATE_LIMIT_MAX_KEYS
+        )
+        self.conversations = ConversationStore(
+            max_turns=config.AI_HISTORY_TURNS,
+            token_budget=config.AI_HISTORY_TOKENS,
+            ttl=config.AI_CONVERSATION_TTL,
+            max_conversations=config.AI_MAX_CONVERSATIONS
+        )
+        self.response_cache = ResponseCache(max_entries=config.AI_CACHE_SIZE, ttl=config.AI_CACHE_TTL)
+        self.scheduler = AIScheduler(
+            concurrency=config.AI_CONCURRENCY,
+            max_queue=config.AI_QUEUE_SIZE,
+            retries=config.AI_RETRIES,
+            base_delay=config.AI_RETRY_DELAY,
+            max_delay=config.AI_RETRY_MAX_DELAY,
+            retryable=is_retryable
+        )
+    
+    async def cog_load(self):
+        dispatcher.register("ai_chat", self.handle_message, feature="ai_channel")
+    
+    async def cog_unload(self):
+        dispatcher.unregister("ai_chat")
     
     @app_commands.command(name="ai", description="AI chat system configuration")
     @app_commands.describe(action="Enable or disable the AI chat system")
@@ -43,7 +83,7 @@ class AIChat(commands.Cog):
                 )
             
             # Save to database
-            update_guild_config(
+            await update_guild_config(
                 interaction.guild_id,
                 ai_channel=ai_channel.id
             )
@@ -66,47 +106,46 @@ class AIChat(commands.Cog):
                            "@Seyo What's the meaning of life?",
                 color=config.PRIMARY
             )
-            embed.set_footer(text="Rate limited to 5 requests per minute")
+            embed.set_footer(text=f"Rate limited to {config.AI_RATE_LIMIT} requests per {config.AI_RATE_PERIOD} seconds")
             await ai_channel.send(embed=embed)
         
         elif action.value == "enable":
-            update_guild_config(interaction.guild_id, ai_channel=1)  # Using 1 as enabled flag
+            await update_guild_config(interaction.guild_id, ai_channel=1)  # Using 1 as enabled flag
             await interaction.response.send_message(
                 "✅ AI chat system has been enabled.",
                 ephemeral=True
             )
         
         elif action.value == "disable":
-            update_guild_config(interaction.guild_id, ai_channel=0)  # Using 0 as disabled flag
+            await update_guild_config(interaction.guild_id, ai_channel=0)  # Using 0 as disabled flag
             await interaction.response.send_message(
                 "⚠️ AI chat system has been disabled.",
                 ephemeral=True
             )
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        # Ignore bots and DMs
-        if message.author.bot or not message.guild:
-            return
+    @app_commands.command(name="ai_cache", description="Reuse AI answers to repeated questions")
+    @app_commands.describe(enabled="Answer identical questions from a cache instead of asking the AI again")
+    @app_commands.default_permissions(manage_guild=True)
+    async def ai_cache(self, interaction: discord.Interaction, enabled: bool):
+        await update_guild_config(interaction.guild_id, ai_cache=int(enabled))
         
+        await interaction.response.send_message(
+            "✅ Repeated questions will be answered from the cache." if enabled
+            else "⚠️ Every question will be sent to the AI again.",
+            ephemeral=True
+        )
+    
+    async def handle_message(self, message, guild_config):
         # Check if AI is mentioned at start of message
         if not message.content.startswith(f"<@{self.bot.user.id}>"):
             return
         
-        # Check guild config
-        config = get_guild_config(message.guild.id)
-        if not config or not config[4]:  # ai_channel
-            return
-        
         # Check if in AI channel if configured
-        if isinstance(config[4], int) and config[4] > 1 and message.channel.id != config[4]:
+        if isinstance(guild_config.ai_channel, int) and guild_config.ai_channel > 1 and message.channel.id != guild_config.ai_channel:
             return
         
         # Rate limiting
-        user_key = f"{message.guild.id}-{message.author.id}"
-        self.rate_limits[user_key] += 1
-        
-        if self.rate_limits[user_key] > 5:
+        if not self.rate_limits.hit(member_key(message.guild.id, message.author.id)):
             await message.reply("⚠️ You're sending too many requests. Please wait a minute.")
             return
         
@@ -119,42 +158,102 @@ class AIChat(commands.Cog):
         # Show typing indicator
         async with message.channel.typing():
             try:
-                # Check if this is an ongoing conversation
-                conversation_id = f"{message.channel.id}-{message.author.id}"
-                if conversation_id in self.active_chats:
-                    # Continue existing conversation
-                    response = await self._get_ai_response(prompt, is_continuation=True)
-                else:
-                    # Start new conversation
-                    self.active_chats.add(conversation_id)
-                    response = await self._get_ai_response(prompt)
+                # Continue this member's conversation in the channel, if any
+                conversation_id = (message.channel.id, message.author.id)
                 
-                # Split long responses
-                if len(response) > 2000:
-                    chunks = [response[i:i+2000] for i in range(0, len(response), 2000)]
-                    for chunk in chunks:
-                        await message.reply(chunk)
+                # Answers without earlier context don't depend on who asks,
+                # so guilds that opted in can share them
+                if guild_config.ai_cache and conversation_id not in self.conversations:
+                    response, fetched = await self.response_cache.get_or_fetch(
+                        normalize_prompt(prompt),
+                        lambda: self._respond(message, conversation_id, prompt)
+                    )
+                    if not fetched:
+                        self.conversations.record(conversation_id, prompt, response)
+                        await self._send_reply(message, response)
                 else:
-                    await message.reply(response)
+                    await self._respond(message, conversation_id, prompt)
                 
+            except SchedulerFull:
+                await message.reply(QUEUE_FULL)
             except Exception as e:
                 print(f"AI Error: {e}")
                 await message.reply("❌ Sorry, I encountered an error. Please try again later.")
     
-    async def _get_ai_response(self, prompt: str, is_continuation: bool = False):
+    async def _respond(self, message, conversation_id, prompt: str):
+        # Asks the AI and replies to the message, returns the reply text
+        async with self.scheduler.slot(
+            message.guild.id, message.author.id,
+            on_queued=lambda position: self._send_queue_position(message, position)
+        ):
+            if config.AI_STREAMING:
+                return await self._stream_ai_response(message, conversation_id, prompt)
+            
+            response = await self._get_ai_response(conversation_id, prompt)
+        
+        await self._send_reply(message, response)
+        return response
+    
+    async def _send_queue_position(self, message, position):
         try:
-            response = await openai.ChatCompletion.acreate(
-                model="gpt-3.5-turbo",
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }],
-                max_tokens=1000,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            raise e
+            await message.reply(f"{QUEUE_NOTICE}{position} in line, I'll answer as soon as I can.")
+        except discord.HTTPException as e:
+            print(f"Error sending queue position: {e}")
+    
+    async def _send_reply(self, message, response: str):
+        # Split long responses
+        if len(response) > 2000:
+            chunks = [response[i:i+2000] for i in range(0, len(response), 2000)]
+            for chunk in chunks:
+                await message.reply(chunk)
+        else:
+            await message.reply(response)
+    
+    async def _get_ai_response(self, conversation_id, prompt: str):
+        response = await self.scheduler.retry(lambda: openai.ChatCompletion.acreate(
+            model="gpt-3.5-turbo",
+            messages=self.conversations.build_messages(conversation_id, prompt),
+            max_tokens=1000,
+            temperature=0.7
+        ))
+        reply = response.choices[0].message.content.strip()
+        
+        # Only remember turns that got an answer
+        self.conversations.record(conversation_id, prompt, reply)
+        return reply
+    
+    async def _stream_ai_response(self, message, conversation_id, prompt: str):
+        # Only opening the stream is retried, once text is shown a retry
+        # would repeat it
+        stream = await self.scheduler.retry(lambda: openai.ChatCompletion.acreate(
+            model="gpt-3.5-turbo",
+            messages=self.conversations.build_messages(conversation_id, prompt),
+            max_tokens=1000,
+            temperature=0.7,
+            stream=True
+        ))
+        
+        reply = StreamingReply(message, edit_interval=config.AI_STREAM_EDIT_INTERVAL)
+        parts = []
+        async for chunk in stream:
+            text = chunk.choices[0].delta.get("content")
+            if text:
+                parts.append(text)
+                await reply.feed(text)
+        
+        if not await reply.finish():
+            raise RuntimeError("Empty AI response")
+        
+        response = "".join(parts).strip()
+        self.conversations.record(conversation_id, prompt, response)
+        return response
+    
+    def stats(self):
+        return {
+            "conversations": self.conversations.stats(),
+            "response_cache": self.response_cache.stats(),
+            "scheduler": self.scheduler.stats()
+        }
 
 async def setup(bot):
     await bot.add_cog(AIChat(bot))
\ No newline at end of file
@@ -1,18 +1,97 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import config
 from utils.database import get_guild_config, update_guild_config
+from utils.dispatcher import dispatcher
 from utils.image_generator import CardGenerator
+from utils.xp_buffer import XPBuffer
+from utils.rank_index import RankTracker
+from utils.leaderboard import LeaderboardCache
+from utils.ratelimit import RateLimiter, member_key
+from utils.announcements import LevelUpAnnouncer
 import random
-import time
-import sqlite3
+
+class LeaderboardView(discord.ui.View):
+    def __init__(self, cog, guild, author_id):
+        super().__init__(timeout=120)
+        self.cog = cog
+        self.guild = guild
+        self.author_id = author_id
+        self.cursors = [None]  # Keyset cursor of every page visited so far
+        self.rows = []
+    
+    async def load(self):
+        self.rows = await self.cog.leaderboards.page(self.guild.id, self.cursors[-1])
+        self.previous_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = len(self.rows) < self.cog.leaderboards.page_size
+    
+    def build_embed(self):
+        page = len(self.cursors) - 1
+        start = page * self.cog.leaderboards.page_size
+        
+        lines = [
+            f"**#{start + i + 1}** <@{user_id}> • Level {level} ({xp:,} XP)"
+            for i, (level, xp, user_id) in enumerate(self.rows)
+        ]
+        
+        embed = discord.Embed(
+            title=f"🏆 {self.guild.name} Leaderboard",
+            description="\n".join(lines) or "No one has earned XP yet.",
+            color=config.PRIMARY
+        )
+        embed.set_footer(text=f"Page {page + 1}")
+        return embed
+    
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message(
+                "❌ Run /leaderboard yourself to flip pages.",
+                ephemeral=True
+            )
+            return False
+        return True
+    
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.pop()
+        await self.load()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+    
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.append(self.rows[-1])
+        await self.load()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
 
 class Leveling(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.card_gen = CardGenerator()
-        self.cooldowns = {}
+        self.announcer = LevelUpAnnouncer(self.card_gen, window=config.LEVEL_UP_WINDOW)
+        self.cooldowns = RateLimiter(1, config.XP_COOLDOWN, max_keys=config.RATE_LIMIT_MAX_KEYS)
+        self.xp_buffer = XPBuffer(self._calculate_max_xp, batch_size=config.XP_FLUSH_BATCH_SIZE)
+        self.ranks = RankTracker(self.xp_buffer)
+        self.leaderboards = LeaderboardCache(
+            self.xp_buffer,
+            page_size=config.LEADERBOARD_PAGE_SIZE,
+            pages=config.LEADERBOARD_CACHED_PAGES
+        )
+        self.flush_xp.start()
+    
+    async def cog_load(self):
+        dispatcher.register("leveling", self.handle_message, feature="level_channel")
+    
+    async def cog_unload(self):
+        dispatcher.unregister("leveling")
+        self.flush_xp.cancel()
+        await self.xp_buffer.flush()
+        await self.announcer.flush()
+        self.card_gen.close()
+    
+    @tasks.loop(seconds=config.XP_FLUSH_INTERVAL)
+    async def flush_xp(self):
+        await self.xp_buffer.flush()
     
     @app_commands.command(name="leveling", description="Setup the leveling system")
     @app_commands.default_permissions(manage_guild=True)
@@ -36,7 +115,7 @@ class Leveling(commands.Cog):
             )
         
         # Save to database
-        update_guild_config(
+        await update_guild_config(
             interaction.guild_id,
             level_channel=level_channel.id
         )
@@ -51,20 +130,30 @@ class Leveling(commands.Cog):
         
         await interaction.response.send_message(embed=embed)
     
+    @app_commands.command(name="card_format", description="Choose the image format of level cards")
+    @app_commands.describe(profile="Smaller formats upload faster, lossy WebP is the smallest")
+    @app_commands.choices(profile=[
+        app_commands.Choice(name="PNG (default)", value="png"),
+        app_commands.Choice(name="Optimized PNG", value="png_optimized"),
+        app_commands.Choice(name="256-color PNG", value="png_palette"),
+        app_commands.Choice(name="Lossless WebP", value="webp_lossless"),
+        app_commands.Choice(name="WebP", value="webp")
+    ])
+    @app_commands.default_permissions(manage_guild=True)
+    async def card_format(self, interaction: discord.Interaction, profile: app_commands.Choice[str]):
+        await update_guild_config(interaction.guild_id, card_format=profile.value)
+        
+        await interaction.response.send_message(
+            f"✅ Level cards will now be sent as {profile.name}.",
+            ephemeral=True
+        )
+    
     @app_commands.command(name="rank", description="Check your rank and level")
     async def rank(self, interaction: discord.Interaction, user: discord.User = None):
         user = user or interaction.user
         
-        # Get user level data
-        conn = sqlite3.connect(config.DB_PATH)
-        c = conn.cursor()
-        
         # Get user's level
-        c.execute("""
-            SELECT xp, level FROM levels 
-            WHERE user_id=? AND guild_id=?
-        """, (user.id, interaction.guild_id))
-        result = c.fetchone()
+        result = await self.xp_buffer.get(interaction.guild_id, user.id)
         
         if not result:
             xp, level = 0, 1
@@ -75,19 +164,24 @@ class Leveling(commands.Cog):
         max_xp = self._calculate_max_xp(level)
         
         # Get user's rank
-        c.execute("""
-            SELECT COUNT(*) FROM levels 
-            WHERE guild_id=? AND (level > ? OR (level = ? AND xp > ?))
-        """, (interaction.guild_id, level, level, xp))
-        rank = c.fetchone()[0] + 1
-        
-        conn.close()
+        rank = await self.ranks.rank(interaction.guild_id, level, xp)
         
         # Generate rank card
-        card = await self.card_gen.generate_rank_card(user, xp, level, max_xp, rank)
+        guild_config = await get_guild_config(interaction.guild_id)
+        card = await self.card_gen.generate_rank_card(
+            user, xp, level, max_xp, rank,
+            profile=guild_config.card_format if guild_config else None
+        )
         
         await interaction.response.send_message(file=card)
     
+    @app_commands.command(name="leaderboard", description="Show the server's top members")
+    async def leaderboard(self, interaction: discord.Interaction):
+        view = LeaderboardView(self, interaction.guild, interaction.user.id)
+        await view.load()
+        
+        await interaction.response.send_message(embed=view.build_embed(), view=view)
+    
     @app_commands.command(name="xp_give", description="Give XP to a user (Admin only)")
     @app_commands.default_permissions(manage_guild=True)
     async def xp_give(self, interaction: discord.Interaction, user: discord.User, amount: int):
@@ -97,55 +191,20 @@ class Leveling(commands.Cog):
                 ephemeral=True
             )
         
-        # Update user's XP
-        conn = sqlite3.connect(config.DB_PATH)
-        c = conn.cursor()
-        
-        # Get current XP
-        c.execute("""
-            SELECT xp, level FROM levels 
-            WHERE user_id=? AND guild_id=?
-        """, (user.id, interaction.guild_id))
-        result = c.fetchone()
-        
-        if result:
-            xp, level = result
-            new_xp = xp + amount
-        else:
-            xp, level = 0, 1
-            new_xp = amount
-        
-        # Check for level up
+        # Update user's XP, applying any level ups
+        old_level, level, new_xp = await self.xp_buffer.add_xp(interaction.guild_id, user.id, amount)
+        levels_gained = level - old_level
         max_xp = self._calculate_max_xp(level)
-        levels_gained = 0
-        
-        while new_xp >= max_xp:
-            new_xp -= max_xp
-            level += 1
-            levels_gained += 1
-            max_xp = self._calculate_max_xp(level)
-        
-        # Update database
-        c.execute("""
-            INSERT OR REPLACE INTO levels (user_id, guild_id, xp, level, last_message)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user.id, interaction.guild_id, new_xp, level, int(time.time())))
-        
-        conn.commit()
-        conn.close()
         
         # Notify if leveled up
         if levels_gained > 0:
-            config = get_guild_config(interaction.guild_id)
-            if config and config[3]:  # level_channel
-                channel = interaction.guild.get_channel(config[3])
+            guild_config = await get_guild_config(interaction.guild_id)
+            if guild_config and guild_config.level_channel:
+                channel = interaction.guild.get_channel(guild_config.level_channel)
                 if channel:
-                    card = await self.card_gen.generate_level_up_card(
-                        user, level - levels_gained, level, new_xp, max_xp
-                    )
-                    await channel.send(
-                        f"🎉 {user.mention} leveled up to level {level}!",
-                        file=card
+                    self.announcer.announce(
+                        channel, user, level - levels_gained, level, new_xp, max_xp,
+                        profile=guild_config.card_format
                     )
         
         await interaction.response.send_message(
@@ -162,16 +221,8 @@ class Leveling(commands.Cog):
                 ephemeral=True
             )
         
-        # Update user's XP
-        conn = sqlite3.connect(config.DB_PATH)
-        c = conn.cursor()
-        
         # Get current XP
-        c.execute("""
-            SELECT xp, level FROM levels 
-            WHERE user_id=? AND guild_id=?
-        """, (user.id, interaction.guild_id))
-        result = c.fetchone()
+        result = await self.xp_buffer.get(interaction.guild_id, user.id)
         
         if not result:
             return await interaction.response.send_message(
@@ -179,97 +230,36 @@ class Leveling(commands.Cog):
                 ephemeral=True
             )
         
-        xp, level = result
-        new_xp = max(0, xp - amount)
-        new_level = level
-        
-        # Check for level down
-        while new_xp < 0 and new_level > 1:
-            new_level -= 1
-            new_xp += self._calculate_max_xp(new_level)
-        
-        # Update database
-        c.execute("""
-            INSERT OR REPLACE INTO levels (user_id, guild_id, xp, level, last_message)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user.id, interaction.guild_id, new_xp, new_level, int(time.time())))
-        
-        conn.commit()
-        conn.close()
+        # Update user's XP
+        new_xp, new_level = await self.xp_buffer.update(
+            interaction.guild_id, user.id,
+            lambda xp, level: (max(0, xp - amount), level)
+        )
         
         await interaction.response.send_message(
             f"✅ Removed {amount} XP from {user.mention}. They're now level {new_level} with {new_xp}/{self._calculate_max_xp(new_level)} XP.",
             ephemeral=True
         )
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        # Ignore bots and DMs
-        if message.author.bot or not message.guild:
-            return
-        
+    async def handle_message(self, message, guild_config):
         # Check cooldown
-        cooldown_key = f"{message.guild.id}-{message.author.id}"
-        if cooldown_key in self.cooldowns and time.time() - self.cooldowns[cooldown_key] < 60:
-            return
-        
-        # Get guild config
-        config = get_guild_config(message.guild.id)
-        if not config or not config[3]:  # level_channel
+        if not self.cooldowns.hit(member_key(message.guild.id, message.author.id)):
             return
         
         # Give random XP between 15-25
         xp = random.randint(15, 25)
         
-        # Update database
-        conn = sqlite3.connect(config.DB_PATH)
-        c = conn.cursor()
-        
-        # Get current XP
-        c.execute("""
-            SELECT xp, level FROM levels 
-            WHERE user_id=? AND guild_id=?
-        """, (message.author.id, message.guild.id))
-        result = c.fetchone()
-        
-        if result:
-            current_xp, level = result
-            new_xp = current_xp + xp
-        else:
-            current_xp, level = 0, 1
-            new_xp = xp
-        
-        # Check for level up
-        max_xp = self._calculate_max_xp(level)
-        leveled_up = False
-        
-        if new_xp >= max_xp:
-            new_xp -= max_xp
-            level += 1
-            leveled_up = True
-        
-        # Update database
-        c.execute("""
-            INSERT OR REPLACE INTO levels (user_id, guild_id, xp, level, last_message)
-            VALUES (?, ?, ?, ?, ?)
-        """, (message.author.id, message.guild.id, new_xp, level, int(time.time())))
-        
-        conn.commit()
-        conn.close()
-        
-        # Update cooldown
-        self.cooldowns[cooldown_key] = time.time()
+        # Buffer the XP, level ups are computed from the buffered state
+        old_level, level, new_xp = await self.xp_buffer.add_xp(message.guild.id, message.author.id, xp)
+        leveled_up = level > old_level
         
         # Send level up message if applicable
-        if leveled_up and config[3]:
-            channel = message.guild.get_channel(config[3])
+        if leveled_up and guild_config.level_channel:
+            channel = message.guild.get_channel(guild_config.level_channel)
             if channel:
-                card = await self.card_gen.generate_level_up_card(
-                    message.author, level - 1, level, new_xp, self._calculate_max_xp(level)
-                )
-                await channel.send(
-                    f"🎉 {message.author.mention} leveled up to level {level}!",
-                    file=card
+                self.announcer.announce(
+                    channel, message.author, old_level, level, new_xp, self._calculate_max_xp(level),
+                    profile=guild_config.card_format
                 )
     
     def _calculate_max_xp(self, level):
@@ -30,7 +30,7 @@ class Suggestions(commands.Cog):
             )
         
         # Save to database
-        update_guild_config(
+        await update_guild_config(
             interaction.guild_id,
             suggestions_channel=suggestions_channel.id
         )
@@ -59,15 +59,15 @@ class Suggestions(commands.Cog):
     
     @app_commands.command(name="suggest", description="Submit a suggestion")
     async def suggest(self, interaction: discord.Interaction, suggestion: str):
-        config = get_guild_config(interaction.guild_id)
-        if not config or not config[2]:  # suggestions_channel
+        guild_config = await get_guild_config(interaction.guild_id)
+        if not guild_config or not guild_config.suggestions_channel:
             return await interaction.response.send_message(
                 "❌ Suggestion system is not setup on this server.",
                 ephemeral=True
             )
         
         # Get suggestions channel
-        channel = interaction.guild.get_channel(config[2])
+        channel = interaction.guild.get_channel(guild_config.suggestions_channel)
         if not channel:
             return await interaction.response.send_message(
                 "❌ Suggestions channel not found.",
@@ -103,8 +103,8 @@ class Suggestions(commands.Cog):
             return
         
         # Check if this is a suggestion message
-        config = get_guild_config(payload.guild_id)
-        if not config or not config[2] or payload.channel_id != config[2]:
+        guild_config = await get_guild_config(payload.guild_id)
+        if not guild_config or not guild_config.suggestions_channel or payload.channel_id != guild_config.suggestions_channel:
             return
         
         channel = self.bot.get_channel(payload.channel_id)
@@ -2,24 +2,81 @@ import discord
 from discord.ext import commands, tasks
 from discord import app_commands
 import config
-from utils.database import get_guild_config, update_guild_config
-import yt_dlp
+from utils.database import db, get_guild_config, update_guild_config
+from utils.yt_extractor import ExtractorPool
+from utils.youtube_feed import FeedClient, entries_from_info, published_timestamp
+from utils.poll_scheduler import PollScheduler
+from utils.websub import WebSubReceiver
+import xml.etree.ElementTree as ET
+import aiohttp
 import asyncio
+import time
 from datetime import datetime
 import re
 
+def _subscribe(conn, channel_id, guild_id, channel_name, last_video_id):
+    # Other guilds may have started following the channel meanwhile, their
+    # state row is kept
+    conn.execute("""
+        INSERT OR IGNORE INTO youtube_channel_state (channel_id, channel_name, last_video_id)
+        VALUES (?, ?, ?)
+    """, (channel_id, channel_name, last_video_id))
+    conn.execute("""
+        INSERT OR IGNORE INTO youtube_subscriptions (channel_id, guild_id)
+        VALUES (?, ?)
+    """, (channel_id, guild_id))
+
 class YouTubeNotifier(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.yt_dlp_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': True
-        }
+        self.extractor = ExtractorPool(workers=config.YT_WORKERS, timeout=config.YT_EXTRACT_TIMEOUT)
+        self.session = None
+        self.feeds = None
+        self.websub = None
+        self._locks = {}  # channel_id -> lock so a poll and a push never announce the same video
+        self.polls = PollScheduler(
+            min_interval=config.YT_MIN_INTERVAL,
+            max_interval=config.YT_MAX_INTERVAL,
+            default_interval=config.YT_DEFAULT_INTERVAL,
+            checks_per_upload=config.YT_CHECKS_PER_UPLOAD,
+            boost_window=config.YT_BOOST_WINDOW,
+            jitter=config.YT_POLL_JITTER,
+            budget_per_minute=config.YT_CHECKS_PER_MINUTE
+        )
+        self.synced = False
+        self.check_counts = {}  # Check results since the last report
+        self.check_seconds = 0.0
+        self.last_report = time.monotonic()
+        self.last_cycle = None  # Summary of the last report period
         self.check_channels.start()
     
-    def cog_unload(self):
+    async def cog_load(self):
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=config.YT_FEED_TIMEOUT))
+        self.feeds = FeedClient(self.session)
+        
+        if config.YT_WEBSUB_ENABLED:
+            if not (config.YT_WEBSUB_CALLBACK_URL and config.YT_WEBSUB_SECRET):
+                print("YouTube push notifications need YT_WEBSUB_CALLBACK_URL and YT_WEBSUB_SECRET, polling only")
+                return
+            self.websub = WebSubReceiver(
+                self.session,
+                config.YT_WEBSUB_HUB,
+                config.YT_WEBSUB_CALLBACK_URL,
+                config.YT_WEBSUB_SECRET,
+                on_feed=self._on_push,
+                lease_seconds=config.YT_WEBSUB_LEASE,
+                renew_before=config.YT_WEBSUB_RENEW_BEFORE
+            )
+            await self.websub.start(config.YT_WEBSUB_HOST, config.YT_WEBSUB_PORT)
+            self.renew_leases.start()
+    
+    async def cog_unload(self):
         self.check_channels.cancel()
+        self.renew_leases.cancel()
+        if self.websub:
+            await self.websub.close()
+        self.extractor.close()
+        await self.session.close()
     
     @app_commands.command(name="yt", description="YouTube notification system")
     @app_commands.describe(action="Choose an action", channel="YouTube channel URL")
@@ -51,7 +108,7 @@ class YouTubeNotifier(commands.Cog):
                 )
             
             # Save to database
-            update_guild_config(
+            await update_guild_config(
                 interaction.guild_id,
                 yt_notify_channel=notify_channel.id
             )
@@ -80,154 +137,312 @@ class YouTubeNotifier(commands.Cog):
                     ephemeral=True
                 )
             
+            # Fetching from YouTube can take longer than Discord waits for a response
+            await interaction.response.defer(ephemeral=True)
+            
             # Extract channel ID
             try:
-                with yt_dlp.YoutubeDL(self.yt_dlp_opts) as ydl:
-                    info = ydl.extract_info(channel, download=False)
-                    channel_id = info.get('channel_id')
-                    channel_name = info.get('channel')
-                    
-                    if not channel_id:
-                        return await interaction.response.send_message(
-                            "❌ Couldn't extract channel ID from URL.",
-                            ephemeral=True
-                        )
+                info = await self.extractor.extract(channel)
+                channel_id = info.get('channel_id')
+                channel_name = info.get('channel')
+                
+                if not channel_id:
+                    return await interaction.followup.send(
+                        "❌ Couldn't extract channel ID from URL.",
+                        ephemeral=True
+                    )
+            except asyncio.TimeoutError:
+                return await interaction.followup.send(
+                    "❌ YouTube took too long to respond, please try again later.",
+                    ephemeral=True
+                )
             except Exception as e:
-                return await interaction.response.send_message(
+                return await interaction.followup.send(
                     f"❌ Error fetching channel info: {e}",
                     ephemeral=True
                 )
             
-            # Save to database
-            conn = sqlite3.connect(config.DB_PATH)
-            c = conn.cursor()
-            
             # Check if already exists
-            c.execute("""
-                SELECT 1 FROM youtube_channels 
+            exists = await db.fetchone("""
+                SELECT 1 FROM youtube_subscriptions
                 WHERE channel_id=? AND guild_id=?
             """, (channel_id, interaction.guild_id))
             
-            if c.fetchone():
-                conn.close()
-                return await interaction.response.send_message(
+            if exists:
+                return await interaction.followup.send(
                     "⚠️ This channel is already being tracked.",
                     ephemeral=True
                 )
             
+            # Another guild already follows it, its latest video is known
+            state = await db.fetchone("""
+                SELECT last_video_id FROM youtube_channel_state
+                WHERE channel_id=?
+            """, (channel_id,))
+            
+            if state:
+                await db.transaction(_subscribe, channel_id, interaction.guild_id, channel_name, state[0])
+                self.polls.add(channel_id)
+                if self.websub:
+                    await self.websub.subscribe(channel_id)
+                return await interaction.followup.send(
+                    f"✅ Now tracking YouTube channel: **{channel_name}**",
+                    ephemeral=True
+                )
+            
             # Get latest video
             try:
-                with yt_dlp.YoutubeDL(self.yt_dlp_opts) as ydl:
-                    info = ydl.extract_info(f"https://www.youtube.com/channel/{channel_id}/videos", download=False)
-                    entries = info.get('entries', [])
-                    latest_video = entries[0] if entries else None
-                    
-                    if not latest_video:
-                        return await interaction.response.send_message(
-                            "❌ Channel has no videos or couldn't fetch them.",
-                            ephemeral=True
-                        )
-                    
-                    # Save to database
-                    c.execute("""
-                        INSERT INTO youtube_channels (channel_id, guild_id, last_video_id)
-                        VALUES (?, ?, ?)
-                    """, (channel_id, interaction.guild_id, latest_video['id']))
-                    
-                    conn.commit()
-                    conn.close()
-                    
-                    await interaction.response.send_message(
-                        f"✅ Now tracking YouTube channel: **{channel_name}**\n"
-                        f"Latest video: {latest_video['title']}",
+                info = await self.extractor.extract(f"https://www.youtube.com/channel/{channel_id}/videos")
+                entries = info.get('entries', [])
+                latest_video = entries[0] if entries else None
+                
+                if not latest_video:
+                    return await interaction.followup.send(
+                        "❌ Channel has no videos or couldn't fetch them.",
                         ephemeral=True
                     )
+                
+                # Save to database
+                await db.transaction(_subscribe, channel_id, interaction.guild_id, channel_name, latest_video['id'])
+                self.polls.add(channel_id)
+                if self.websub:
+                    await self.websub.subscribe(channel_id)
+                
+                await interaction.followup.send(
+                    f"✅ Now tracking YouTube channel: **{channel_name}**\n"
+                    f"Latest video: {latest_video['title']}",
+                    ephemeral=True
+                )
+            except asyncio.TimeoutError:
+                return await interaction.followup.send(
+                    "❌ YouTube took too long to respond, please try again later.",
+                    ephemeral=True
+                )
             except Exception as e:
-                conn.close()
-                return await interaction.response.send_message(
+                return await interaction.followup.send(
                     f"❌ Error fetching channel videos: {e}",
                     ephemeral=True
                 )
     
-    @tasks.loop(minutes=10)
+    @tasks.loop(seconds=config.YT_POLL_TICK)
     async def check_channels(self):
-        # Get all channels to check
-        conn = sqlite3.connect(config.DB_PATH)
-        c = conn.cursor()
+        if not self.synced:
+            rows = await db.fetchall("SELECT DISTINCT channel_id FROM youtube_subscriptions")
+            self.polls.sync(row[0] for row in rows)
+            self.synced = True
+        
+        due = self.polls.due()
+        if due:
+            start = time.monotonic()
+            
+            # Get the due channels with the channels to announce them in
+            rows = await db.fetchall(f"""
+                SELECT s.channel_id, s.guild_id, g.yt_notify_channel
+                FROM youtube_subscriptions s
+                JOIN guilds g ON s.guild_id = g.guild_id
+                WHERE s.channel_id IN ({", ".join("?" * len(due))})
+                AND g.yt_notify_channel IS NOT NULL
+            """, due)
+            
+            # Each YouTube channel is fetched once however many guilds follow it
+            channels = {}
+            for channel_id, guild_id, notify_channel_id in rows:
+                channels.setdefault(channel_id, []).append((guild_id, notify_channel_id))
+            
+            # Checks run side by side, bounded by the HTTP connection limit and
+            # the extractor pool
+            results = await asyncio.gather(*(
+                self._check_channel(channel_id, targets)
+                for channel_id, targets in channels.items()
+            ))
+            
+            for result in results:
+                self.check_counts[result] = self.check_counts.get(result, 0) + 1
+            self.check_seconds += time.monotonic() - start
+        
+        if time.monotonic() - self.last_report >= config.YT_REPORT_INTERVAL:
+            self._report()
+    
+    @tasks.loop(minutes=1)
+    async def renew_leases(self):
+        if not self.synced:
+            return
+        
+        renew = []
+        for channel_id in self.polls.channels():
+            # Polling covers channels whose lease lapsed until it is renewed
+            self.polls.set_pushed(channel_id, self.websub.active(channel_id))
+            if self.websub.needs_renewal(channel_id):
+                renew.append(channel_id)
         
-        c.execute("""
-            SELECT yc.channel_id, yc.guild_id, yc.last_video_id, g.yt_notify_channel
-            FROM youtube_channels yc
-            JOIN guilds g ON yc.guild_id = g.guild_id
-            WHERE g.yt_notify_channel IS NOT NULL
-        """)
+        await asyncio.gather(*(self.websub.subscribe(channel_id) for channel_id in renew))
+    
+    async def _on_push(self, feed):
+        channel_id = feed.channel_id
+        if channel_id not in self.polls:
+            return
         
-        channels = c.fetchall()
-        conn.close()
+        async with self._locks.setdefault(channel_id, asyncio.Lock()):
+            state = await db.fetchone("""
+                SELECT channel_name, last_video_id, last_published FROM youtube_channel_state
+                WHERE channel_id=?
+            """, (channel_id,))
+            if not state:
+                return
+            channel_name, last_video_id, last_published = state
+            
+            # Edits to older videos are pushed too, only uploads newer than
+            # the last announced one are new. Without its upload time a
+            # regular check decides instead. Pushed feeds don't carry the
+            # channel name, the stored one is used.
+            if last_published is None:
+                self.polls.check_soon(channel_id)
+                return
+            
+            videos = sorted(
+                (
+                    entry for entry in feed.entries
+                    if entry.video_id != last_video_id and (published_timestamp(entry.published) or 0) > last_published
+                ),
+                key=lambda entry: published_timestamp(entry.published),
+                reverse=True
+            )
+            if not videos:
+                return
+            
+            self.polls.record(channel_id, [published_timestamp(video.published) for video in videos], new_upload=True)
+            
+            rows = await db.fetchall("""
+                SELECT s.guild_id, g.yt_notify_channel
+                FROM youtube_subscriptions s
+                JOIN guilds g ON s.guild_id = g.guild_id
+                WHERE s.channel_id=? AND g.yt_notify_channel IS NOT NULL
+            """, (channel_id,))
+            await self._deliver(channel_id, channel_name, videos, self._notify_channels(rows))
+    
+    def _report(self):
+        counts = self.check_counts
+        self.last_cycle = {
+            **self.polls.stats(),
+            "period_seconds": time.monotonic() - self.last_report,
+            "checked": sum(counts.values()),
+            "check_seconds": self.check_seconds,
+            "not_modified": counts.get("not_modified", 0),
+            "fallback": counts.get("fallback", 0),
+            "failed": counts.get("failed", 0),
+            "timed_out": counts.get("timed_out", 0)
+        }
+        print(
+            f"Checked {self.last_cycle['checked']} of {self.last_cycle['channels']} YouTube channels "
+            f"in the last {self.last_cycle['period_seconds'] / 60:.0f} minutes, {self.check_seconds:.1f}s spent "
+            f"({self.last_cycle['not_modified']} unchanged, {self.last_cycle['fallback']} via yt-dlp, "
+            f"{self.last_cycle['failed']} failed, {self.last_cycle['timed_out']} timed out, "
+            f"{self.last_cycle['overdue']} overdue)"
+        )
+        self.check_counts = {}
+        self.check_seconds = 0.0
+        self.last_report = time.monotonic()
+    
+    async def _fetch_new_videos(self, channel_id, last_video_id):
+        # Returns (status, channel name, videos newer than last_video_id
+        # newest first, upload times seen), the feed is tried first and
+        # yt-dlp only if it fails. Older upload times are only collected
+        # until the channel's cadence is known.
+        try:
+            feed = await self.feeds.fetch(channel_id, last_video_id, history=not self.polls.knows(channel_id))
+            if feed is None:
+                return "not_modified", None, [], []
+            return "ok", feed.title, feed.new_entries(), feed.published
+        except (aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError) as e:
+            print(f"Feed of YouTube channel {channel_id} failed, falling back to yt-dlp: {type(e).__name__} {e}")
         
-        for channel_id, guild_id, last_video_id, notify_channel_id in channels:
+        info = await self.extractor.extract(f"https://www.youtube.com/channel/{channel_id}/videos")
+        uploads = [published_timestamp(entry.get('upload_date')) for entry in info.get('entries') or []]
+        return "fallback", info.get('channel'), entries_from_info(info, last_video_id), [t for t in uploads if t]
+    
+    def _notify_channels(self, targets):
+        notify_channels = []
+        for guild_id, notify_channel_id in targets:
             guild = self.bot.get_guild(guild_id)
-            if not guild:
-                continue
+            channel = guild.get_channel(notify_channel_id) if guild else None
+            if channel:
+                notify_channels.append(channel)
+        return notify_channels
+    
+    async def _check_channel(self, channel_id, targets):
+        notify_channels = self._notify_channels(targets)
+        if not notify_channels:
+            return "skipped"
+        
+        # Check for new videos
+        try:
+            async with self._locks.setdefault(channel_id, asyncio.Lock()):
+                state = await db.fetchone("""
+                    SELECT last_video_id FROM youtube_channel_state
+                    WHERE channel_id=?
+                """, (channel_id,))
+                last_video_id = state[0] if state else None
                 
-            notify_channel = guild.get_channel(notify_channel_id)
-            if not notify_channel:
-                continue
+                status, channel_name, videos, uploads = await self._fetch_new_videos(channel_id, last_video_id)
+                self.polls.record(channel_id, uploads, new_upload=bool(videos))
+                await self._deliver(channel_id, channel_name, videos, notify_channels)
+            return status
             
-            # Check for new videos
-            try:
-                with yt_dlp.YoutubeDL(self.yt_dlp_opts) as ydl:
-                    info = ydl.extract_info(f"https://www.youtube.com/channel/{channel_id}/videos", download=False)
-                    entries = info.get('entries', [])
-                    
-                    if not entries:
-                        continue
-                    
-                    latest_video = entries[0]
-                    if latest_video['id'] == last_video_id:
-                        continue
-                    
-                    # New video found!
-                    video_url = latest_video['url']
-                    upload_time = latest_video.get('upload_date')
-                    
-                    if upload_time:
-                        upload_time = datetime.strptime(upload_time, '%Y%m%d').strftime('%B %d, %Y')
-                    else:
-                        upload_time = "recently"
-                    
-                    # Create embed
-                    embed = discord.Embed(
-                        title=latest_video['title'],
-                        url=video_url,
-                        color=config.PRIMARY
-                    )
-                    embed.set_author(name=info.get('channel', 'YouTube Channel'))
-                    embed.add_field(name="Uploaded", value=upload_time, inline=True)
-                    embed.set_image(url=latest_video.get('thumbnail'))
-                    
-                    # Send notification
-                    await notify_channel.send(
-                        f"🎬 NEW VIDEO from **{info.get('channel', 'YouTube Channel')}**!",
-                        embed=embed
-                    )
-                    
-                    # Update database
-                    conn = sqlite3.connect(config.DB_PATH)
-                    c = conn.cursor()
-                    c.execute("""
-                        UPDATE youtube_channels
-                        SET last_video_id=?
-                        WHERE channel_id=? AND guild_id=?
-                    """, (latest_video['id'], channel_id, guild_id))
-                    conn.commit()
-                    conn.close()
-                    
-            except Exception as e:
-                print(f"Error checking YouTube channel {channel_id}: {e}")
-                continue
+        except asyncio.TimeoutError:
+            print(f"Timed out checking YouTube channel {channel_id}")
+            return "timed_out"
+        except Exception as e:
+            print(f"Error checking YouTube channel {channel_id}: {e}")
+            return "failed"
+    
+    async def _deliver(self, channel_id, channel_name, videos, notify_channels):
+        # Announces videos (newest first) everywhere and remembers the newest
+        if not videos:
+            return
+        
+        await asyncio.gather(*(
+            self._announce(channel, channel_name, videos)
+            for channel in notify_channels
+        ))
+        
+        # Update database
+        await db.execute("""
+            UPDATE youtube_channel_state
+            SET last_video_id=?, last_published=COALESCE(?, last_published), channel_name=COALESCE(?, channel_name)
+            WHERE channel_id=?
+        """, (videos[0].video_id, published_timestamp(videos[0].published), channel_name, channel_id))
+    
+    async def _announce(self, notify_channel, channel_name, videos):
+        # Oldest first so they read in upload order
+        try:
+            for video in reversed(videos):
+                await notify_channel.send(
+                    f"🎬 NEW VIDEO from **{channel_name or 'YouTube Channel'}**!",
+                    embed=self._video_embed(channel_name, video)
+                )
+        except discord.HTTPException as e:
+            print(f"Error announcing YouTube video in {notify_channel.id}: {e}")
+    
+    def _video_embed(self, channel_name, video):
+        if not video.published:
+            upload_time = "recently"
+        elif len(video.published) == 8:
+            upload_time = datetime.strptime(video.published, '%Y%m%d').strftime('%B %d, %Y')
+        else:
+            upload_time = datetime.fromisoformat(video.published).strftime('%B %d, %Y')
+        
+        embed = discord.Embed(
+            title=video.title,
+            url=video.url,
+            color=config.PRIMARY
+        )
+        embed.set_author(name=channel_name or 'YouTube Channel')
+        embed.add_field(name="Uploaded", value=upload_time, inline=True)
+        embed.set_image(url=video.thumbnail)
+        return embed
     
     @check_channels.before_loop
+    @renew_leases.before_loop
     async def before_check_channels(self):
         await self.bot.wait_until_ready()
 
@@ -3,12 +3,19 @@ from discord.ext import commands
 from discord import app_commands
 import config
 from utils.database import get_guild_config, update_guild_config
+from utils.dispatcher import dispatcher
 import re
 
 class YouTubeVerifier(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
+    async def cog_load(self):
+        dispatcher.register("youtube_verifier", self.handle_message, feature="yt_verify_channel")
+    
+    async def cog_unload(self):
+        dispatcher.unregister("youtube_verifier")
+    
     @app_commands.command(name="ytsub", description="YouTube subscription verification system")
     @app_commands.describe(
         action="Choose an action",
@@ -58,7 +65,7 @@ class YouTubeVerifier(commands.Cog):
                 )
             
             # Save to database
-            update_guild_config(
+            await update_guild_config(
                 interaction.guild_id,
                 yt_verify_channel=proof_channel.id,
                 yt_verify_role=role.id
@@ -85,28 +92,22 @@ class YouTubeVerifier(commands.Cog):
             await proof_channel.send(embed=embed)
         
         elif action.value == "enable":
-            update_guild_config(interaction.guild_id, yt_verify_channel=1)  # Using 1 as enabled flag
+            await update_guild_config(interaction.guild_id, yt_verify_channel=1)  # Using 1 as enabled flag
             await interaction.response.send_message(
                 "✅ YouTube verification system has been enabled.",
                 ephemeral=True
             )
         
         elif action.value == "disable":
-            update_guild_config(interaction.guild_id, yt_verify_channel=0)  # Using 0 as disabled flag
+            await update_guild_config(interaction.guild_id, yt_verify_channel=0)  # Using 0 as disabled flag
             await interaction.response.send_message(
                 "⚠️ YouTube verification system has been disabled.",
                 ephemeral=True
             )
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        # Ignore bots and DMs
-        if message.author.bot or not message.guild:
-            return
-        
+    async def handle_message(self, message, guild_config):
         # Check if this is a proof submission
-        config = get_guild_config(message.guild.id)
-        if not config or not config[1] or message.channel.id != config[1]:
+        if message.channel.id != guild_config.yt_verify_channel:
             return
         
         # Check if message has attachments
@@ -127,7 +128,7 @@ class YouTubeVerifier(commands.Cog):
         embed.set_image(url=message.attachments[0].url)
         embed.set_footer(text="React with ✅ to approve or ❌ to reject")
         
-        log_channel = message.guild.get_channel(config[1])
+        log_channel = message.guild.get_channel(guild_config.yt_verify_channel)
         if log_channel:
             log_msg = await log_channel.send(embed=embed)
             await log_msg.add_reaction("✅")
@@ -151,12 +152,12 @@ class YouTubeVerifier(commands.Cog):
             return
         
         # Check if this is a verification message
-        config = get_guild_config(payload.guild_id)
-        if not config or not config[1]:
+        guild_config = await get_guild_config(payload.guild_id)
+        if not guild_config or not guild_config.yt_verify_channel:
             return
         
         channel = self.bot.get_channel(payload.channel_id)
-        if not channel or channel.id != config[1]:
+        if not channel or channel.id != guild_config.yt_verify_channel:
             return
         
         message = await channel.fetch_message(payload.message_id)
@@ -179,14 +180,14 @@ class YouTubeVerifier(commands.Cog):
         
         if str(payload.emoji) == "✅":
             # Approve verification
-            role = member.guild.get_role(config[2])
+            role = member.guild.get_role(guild_config.yt_verify_role)
             if role:
                 try:
                     guild_member = await member.guild.fetch_member(user_id)
                     await guild_member.add_roles(role)
                     
                     # Update database
-                    update_guild_config(
+                    await update_guild_config(
                         payload.guild_id,
                         user_id=user_id,
                         status="approved"
@@ -207,7 +208,7 @@ class YouTubeVerifier(commands.Cog):
         
         elif str(payload.emoji) == "❌":
             # Reject verification
-            update_guild_config(
+            await update_guild_config(
                 payload.guild_id,
                 user_id=user_id,
                 status="rejected"
@@ -3,19 +3,86 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-class Config:
-    TOKEN = os.getenv('DISCORD_TOKEN')
-    OPENAI_KEY = os.getenv('OPENAI_API_KEY')
-    DB_PATH = 'data/database.db'
-    
-    # Colors
-    PRIMARY = 0x5865F2
-    SUCCESS = 0x57F287
-    ERROR = 0xED4245
-    
-    # Font paths
-    FONT_REGULAR = 'assets/nunito-regular.ttf'
-    
-    # Image paths
-    LEVEL_CARD = 'assets/levelcard.png'
-    RANK_CARD = 'assets/rankcard.png'
\ No newline at end of file
+TOKEN = os.getenv('DISCORD_TOKEN')
+OPENAI_KEY = os.getenv('OPENAI_API_KEY')
+DB_PATH = 'data/database.db'
+
+# Database
+DB_READERS = 4  # Size of the read-only connection pool
+DB_STATEMENT_CACHE = 128  # Prepared statements cached per connection
+
+# Leveling
+XP_FLUSH_INTERVAL = 30  # Seconds between write-behind XP flushes
+XP_FLUSH_BATCH_SIZE = 500  # Flush early once this many users have buffered XP
+LEADERBOARD_PAGE_SIZE = 10
+LEADERBOARD_CACHED_PAGES = 5  # Top pages per guild kept in memory
+XP_COOLDOWN = 60  # Seconds between messages that earn XP
+LEVEL_UP_WINDOW = 3  # Seconds to collect level ups into one announcement per channel
+
+# Rate limits
+RATE_LIMIT_MAX_KEYS = 100_000  # Tracked members per limiter before LRU eviction
+AI_RATE_LIMIT = 5  # AI requests per member...
+AI_RATE_PERIOD = 60  # ...per this many seconds
+
+# AI chat
+AI_HISTORY_TURNS = 10  # Messages remembered per (channel, member) conversation
+AI_HISTORY_TOKENS = 1500  # Prompt plus history sent per request
+AI_CONVERSATION_TTL = 900  # Seconds of silence before a conversation is forgotten
+AI_MAX_CONVERSATIONS = 10_000
+AI_STREAMING = True  # Post replies while they are generated instead of when complete
+AI_STREAM_EDIT_INTERVAL = 1.0  # Seconds between edits of a streaming reply
+AI_CACHE_SIZE = 1000  # Cached replies to repeated prompts, for guilds that enable /ai_cache
+AI_CACHE_TTL = 3600  # Seconds a cached reply is reused
+AI_CONCURRENCY = 4  # AI requests running at once across all guilds
+AI_QUEUE_SIZE = 50  # Requests waiting for a free slot before new ones are turned away
+AI_RETRIES = 3  # Retries of rate limited or failed requests
+AI_RETRY_DELAY = 1.0  # Base of the exponential backoff between retries, in seconds
+AI_RETRY_MAX_DELAY = 20.0
+
+# Colors
+PRIMARY = 0x5865F2
+SUCCESS = 0x57F287
+ERROR = 0xED4245
+
+# Font paths
+FONT_REGULAR = 'assets/nunito-regular.ttf'
+
+# Image paths
+LEVEL_CARD = 'assets/levelcard.png'
+RANK_CARD = 'assets/rankcard.png'
+
+# Card rendering
+RENDER_WORKERS = 2
+RENDER_QUEUE_SIZE = 16  # Renders waiting for a worker before callers block
+RENDER_USE_PROCESSES = True  # Falls back to threads where processes can't be used
+AVATAR_CACHE_BYTES = 32 * 1024 * 1024  # Memory for prepared avatars
+AVATAR_CACHE_DIR = 'data/avatars'  # Set to None to keep avatars in memory only
+AVATAR_DISK_BYTES = 256 * 1024 * 1024  # Disk for prepared avatars, least recently used go first
+CARD_CACHE_BYTES = 16 * 1024 * 1024  # Memory for already encoded cards
+CARD_FORMAT = 'png'  # Default output profile, see OUTPUT_PROFILES in utils/image_generator.py
+CARD_WEBP_QUALITY = 85  # Quality of the lossy 'webp' profile
+
+# YouTube notifications
+YT_WORKERS = 4  # yt-dlp extractions running at once
+YT_EXTRACT_TIMEOUT = 60  # Seconds before a single extraction is given up
+YT_FEED_TIMEOUT = 15  # Seconds before a feed request is given up and yt-dlp is tried instead
+YT_POLL_TICK = 10  # Seconds between looks at which channels are due for a check
+YT_MIN_INTERVAL = 300  # Bounds of the time between checks of one channel
+YT_MAX_INTERVAL = 6 * 3600
+YT_DEFAULT_INTERVAL = 600  # Until a channel's upload cadence is known
+YT_CHECKS_PER_UPLOAD = 48  # Checks per typical gap between a channel's uploads
+YT_BOOST_WINDOW = 3600  # Seconds after an upload that a channel is checked at YT_MIN_INTERVAL
+YT_POLL_JITTER = 0.2  # Random +/- share added to every interval
+YT_CHECKS_PER_MINUTE = 60  # Upstream checks per minute across all channels
+YT_REPORT_INTERVAL = 600  # Seconds between logged check summaries
+
+# YouTube push notifications (WebSub). Needs a public URL that reaches
+# YT_WEBSUB_HOST:YT_WEBSUB_PORT, polling takes over whenever a lease lapses.
+YT_WEBSUB_ENABLED = False
+YT_WEBSUB_CALLBACK_URL = os.getenv('YT_WEBSUB_CALLBACK_URL')  # e.g. https://bot.example.com/websub
+YT_WEBSUB_SECRET = os.getenv('YT_WEBSUB_SECRET')  # Signs pushed notifications
+YT_WEBSUB_HUB = 'https://pubsubhubbub.appspot.com/subscribe'
+YT_WEBSUB_HOST = '0.0.0.0'
+YT_WEBSUB_PORT = 8080
+YT_WEBSUB_LEASE = 432000  # Seconds of lease asked for, the hub may grant less
+YT_WEBSUB_RENEW_BEFORE = 86400  # Renew leases with less than this many seconds left
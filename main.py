@@ -2,10 +2,15 @@ import discord
 from discord.ext import commands
 import config
 import asyncio
+from utils.database import db, load_guild_configs
+from utils.dispatcher import dispatcher
 
 intents = discord.Intents.all()
 bot = commands.Bot(command_prefix='!', intents=intents)
 
+# Routes every message to the cogs that registered for it
+bot.add_listener(dispatcher.on_message, 'on_message')
+
 async def load_cogs():
     cogs = [
         'cogs.youtube_verifier',
@@ -32,8 +37,14 @@ async def on_ready():
     ))
 
 async def main():
-    async with bot:
-        await load_cogs()
-        await bot.start(config.TOKEN)
+    await db.connect()
+    await load_guild_configs()
+    try:
+        async with bot:
+            await load_cogs()
+            await bot.start(config.TOKEN)
+    finally:
+        await db.close()
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
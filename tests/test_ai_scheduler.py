@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+
+from utils.ai_scheduler import AIScheduler
+
+class AISchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_waiter_does_not_take_freed_slot(self):
+        # A waiter cancelled in the same loop turn the slot is freed used to
+        # get the slot handed to it, which then leaked for good
+        scheduler = AIScheduler(concurrency=1)
+        hold = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot(1, 1):
+                await hold.wait()
+
+        async def waiter():
+            async with scheduler.slot(2, 2):
+                pass
+
+        t1 = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        t2 = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.queued, 1)
+
+        hold.set()
+        t2.cancel()
+        results = await asyncio.gather(t1, t2, return_exceptions=True)
+
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], asyncio.CancelledError)
+        self.assertEqual(scheduler.stats()["active"], 0)
+        self.assertEqual(scheduler.stats()["queued"], 0)
+        async with asyncio.timeout(1):
+            async with scheduler.slot(3, 3):
+                pass
+
+    async def test_freed_slot_skips_to_next_live_waiter(self):
+        scheduler = AIScheduler(concurrency=1)
+        hold = asyncio.Event()
+        served = []
+
+        async def holder():
+            async with scheduler.slot(1, 1):
+                await hold.wait()
+
+        async def waiter(guild_id):
+            async with scheduler.slot(guild_id, guild_id):
+                served.append(guild_id)
+
+        t1 = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        t2 = asyncio.create_task(waiter(2))
+        t3 = asyncio.create_task(waiter(3))
+        await asyncio.sleep(0)
+
+        hold.set()
+        t2.cancel()
+        await asyncio.gather(t1, t2, t3, return_exceptions=True)
+
+        self.assertEqual(served, [3])
+        self.assertEqual(scheduler.stats()["active"], 0)
+
+    async def test_queue_position_follows_round_robin(self):
+        scheduler = AIScheduler(concurrency=1)
+        hold = asyncio.Event()
+        positions = {}
+
+        async def holder():
+            async with scheduler.slot(0, 0):
+                await hold.wait()
+
+        async def waiter(name, guild_id, user_id):
+            async def on_queued(position):
+                positions[name] = position
+            async with scheduler.slot(guild_id, user_id, on_queued=on_queued):
+                pass
+
+        tasks = [asyncio.create_task(holder())]
+        await asyncio.sleep(0)
+        # A busy guild queues three requests before a quiet one sends its first
+        for name, guild_id, user_id in [("a1", 1, 1), ("a2", 1, 1), ("a3", 1, 2), ("b1", 2, 3)]:
+            tasks.append(asyncio.create_task(waiter(name, guild_id, user_id)))
+            await asyncio.sleep(0)
+
+        hold.set()
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(positions, {"a1": 1, "a2": 2, "a3": 2, "b1": 2})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import unittest
+import xml.etree.ElementTree as ET
+
+from utils.youtube_feed import FeedParser, parse_feed, published_timestamp
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+CHANNEL_ID = "UC_x5XG1OV2P6uZZ5FSM9Ttw"
+VIDEO_IDS = ["dQ8nVe1hN2s", "Kp3xR7aLm0Q", "a9ZtW4cYe-E", "Hq_2mBfUs7I", "Tw6pE0jDx4k"]
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+class FeedParserTest(unittest.TestCase):
+    def setUp(self):
+        self.feed = read_fixture("channel_feed.xml")
+
+    def parse_ways(self, data, *args, **kwargs):
+        # The whole document, and in chunks small enough to split tags
+        yield "whole", parse_feed(data, *args, **kwargs)
+        for size in (1, 7, 64):
+            yield f"chunks of {size}", parse_feed(chunked(data, size), *args, **kwargs)
+
+    def test_channel_details(self):
+        for name, result in self.parse_ways(self.feed):
+            with self.subTest(name):
+                self.assertEqual(result.title, "Google for Developers")
+                self.assertEqual(result.channel_id, CHANNEL_ID)
+
+    def test_entries(self):
+        for name, result in self.parse_ways(self.feed):
+            with self.subTest(name):
+                self.assertEqual([entry.video_id for entry in result.entries], VIDEO_IDS)
+                first = result.entries[0]
+                self.assertEqual(first.title, "Building accessible apps & games")
+                self.assertEqual(first.url, "https://www.youtube.com/watch?v=dQ8nVe1hN2s")
+                self.assertEqual(first.published, "2026-03-14T16:00:12+00:00")
+                self.assertEqual(first.thumbnail, "https://i2.ytimg.com/vi/dQ8nVe1hN2s/hqdefault.jpg")
+
+    def test_stops_at_last_video(self):
+        for name, result in self.parse_ways(self.feed, VIDEO_IDS[2]):
+            with self.subTest(name):
+                self.assertTrue(result.found)
+                self.assertEqual([entry.video_id for entry in result.new_entries()], VIDEO_IDS[:2])
+                # Entries after the last video aren't parsed at all
+                self.assertEqual(len(result.published), 3)
+
+    def test_last_video_newest(self):
+        for name, result in self.parse_ways(self.feed, VIDEO_IDS[0]):
+            with self.subTest(name):
+                self.assertTrue(result.found)
+                self.assertEqual(result.new_entries(), [])
+
+    def test_skips_rest_of_document_once_found(self):
+        # A document cut off after the last video is fine, the parser never
+        # reads that far and close() doesn't check that it is complete
+        end = self.feed.index(b"</entry>", self.feed.index(VIDEO_IDS[1].encode())) + len(b"</entry>")
+        for size in (None, 7):
+            with self.subTest(size=size):
+                data = self.feed[:end] + b"<entry><broken"
+                result = parse_feed(data if size is None else chunked(data, size), VIDEO_IDS[1])
+                self.assertEqual([entry.video_id for entry in result.new_entries()], VIDEO_IDS[:1])
+
+    def test_incomplete_document_without_last_video(self):
+        parser = FeedParser(VIDEO_IDS[1])
+        parser.feed(self.feed[:self.feed.index(b"<entry>")])
+        with self.assertRaises(ET.ParseError):
+            parser.close()
+
+    def test_history_collects_every_upload(self):
+        for name, result in self.parse_ways(self.feed, VIDEO_IDS[1], history=True):
+            with self.subTest(name):
+                self.assertTrue(result.found)
+                self.assertEqual([entry.video_id for entry in result.new_entries()], VIDEO_IDS[:1])
+                self.assertEqual(len(result.published), len(VIDEO_IDS))
+                self.assertEqual(result.published[-1], published_timestamp("2026-02-10T18:00:00+00:00"))
+
+    def test_last_video_dropped_out_of_feed(self):
+        # No telling which entries are new, only the latest counts
+        for name, result in self.parse_ways(self.feed, "deletedVid0"):
+            with self.subTest(name):
+                self.assertFalse(result.found)
+                self.assertEqual(len(result.entries), len(VIDEO_IDS))
+                self.assertEqual([entry.video_id for entry in result.new_entries()], VIDEO_IDS[:1])
+
+    def test_websub_notification(self):
+        for name, result in self.parse_ways(read_fixture("websub_notification.xml")):
+            with self.subTest(name):
+                # Pushed feeds only name the channel inside the entry
+                self.assertEqual(result.channel_id, CHANNEL_ID)
+                self.assertEqual(result.title, "YouTube video feed")
+                self.assertEqual([entry.video_id for entry in result.entries], ["Zr5uN8bGq1c"])
+                entry = result.entries[0]
+                self.assertEqual(entry.title, "Shipping faster with the new build tools")
+                self.assertEqual(entry.published, "2026-03-18T16:00:08+00:00")
+                self.assertIsNone(entry.thumbnail)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,15 @@
 # utils/__init__.py
 
-from .database import create_connection, get_guild_config, update_guild_config
+from .database import db, guild_configs, GuildConfig, get_guild_config, update_guild_config
 from .image_generator import CardGenerator
+from .dispatcher import MessageDispatcher
 
 __all__ = [
-    'create_connection',
+    'db',
+    'guild_configs',
+    'GuildConfig',
     'get_guild_config',
     'update_guild_config',
-    'CardGenerator'
+    'CardGenerator',
+    'MessageDispatcher'
 ]
\ No newline at end of file
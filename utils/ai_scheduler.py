@@ -0,0 +1,161 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+class SchedulerFull(Exception):
+    pass
+
+# Limits how many AI requests run at once across the whole bot. Requests that
+# can't start right away wait in a queue served round robin, first across
+# guilds and then across members within a guild, so one busy guild or one
+# spammy member can't starve everyone else. Once the queue is full new
+# requests are turned away with SchedulerFull instead of piling up.
+class AIScheduler:
+    def __init__(self, concurrency=4, max_queue=50, retries=3, base_delay=1.0, max_delay=20.0, retryable=None):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable = retryable or (lambda error: False)
+        self._queues = OrderedDict()  # guild_id -> OrderedDict(user_id -> deque of waiting futures)
+        self.active = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.served = 0
+        self.waited = 0.0
+        self.max_wait = 0.0
+        self.retried = 0
+        self.shed = 0
+
+    @asynccontextmanager
+    async def slot(self, guild_id, user_id, on_queued=None):
+        # on_queued(position) is awaited when the request has to wait
+        await self._acquire(guild_id, user_id, on_queued)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, guild_id, user_id, on_queued):
+        start = time.monotonic()
+        if self.active < self.concurrency and not self.queued:
+            self.active += 1
+        else:
+            if self.queued >= self.max_queue:
+                self.shed += 1
+                raise SchedulerFull(self.queued)
+
+            future = asyncio.get_running_loop().create_future()
+            users = self._queues.setdefault(guild_id, OrderedDict())
+            users.setdefault(user_id, deque()).append(future)
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+            try:
+                if on_queued:
+                    await on_queued(self._position(future))
+                await future
+            except BaseException:
+                if future.done() and not future.cancelled():
+                    # The slot was already handed over, pass it on
+                    self._release()
+                elif self._waiting(guild_id, user_id, future):
+                    future.cancel()
+                    self._remove(guild_id, user_id, future)
+                raise
+
+        wait = time.monotonic() - start
+        self.served += 1
+        self.waited += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def _waiting(self, guild_id, user_id, future):
+        # Whether the future is still queued, _release may have taken it
+        # out already
+        return future in self._queues.get(guild_id, {}).get(user_id, ())
+
+    def _position(self, future):
+        # Place in line under the round robin order, 1 is next. Requests
+        # from other guilds that arrive later can still move ahead of it.
+        guilds = deque(
+            deque(deque(waiters) for waiters in users.values())
+            for users in self._queues.values()
+        )
+        position = 0
+        while guilds:
+            users = guilds.popleft()
+            waiters = users.popleft()
+            waiter = waiters.popleft()
+            if waiter is future:
+                return position + 1
+            if not waiter.done():
+                position += 1
+            if waiters:
+                users.append(waiters)
+            if users:
+                guilds.append(users)
+        return position
+
+    def _remove(self, guild_id, user_id, future):
+        users = self._queues[guild_id]
+        waiters = users[user_id]
+        waiters.remove(future)
+        self.queued -= 1
+        if not waiters:
+            del users[user_id]
+            if not users:
+                del self._queues[guild_id]
+
+    def _release(self):
+        while self._queues:
+            # Next guild in turn, then the next member in turn within it,
+            # both go to the back of the line afterwards
+            guild_id, users = next(iter(self._queues.items()))
+            user_id, waiters = next(iter(users.items()))
+            future = waiters.popleft()
+            self.queued -= 1
+
+            if waiters:
+                users.move_to_end(user_id)
+            else:
+                del users[user_id]
+            if users:
+                self._queues.move_to_end(guild_id)
+            else:
+                del self._queues[guild_id]
+
+            # Cancelled waiters that haven't run yet are skipped, the slot
+            # goes straight to the next live one and active stays the same
+            if not future.done():
+                future.set_result(None)
+                return
+
+        self.active -= 1
+
+    async def retry(self, fn):
+        # Calls fn() again after failures that retryable() accepts, waiting a
+        # random part of an exponentially growing delay so retries from many
+        # requests don't all land at once
+        for attempt in range(self.retries + 1):
+            try:
+                return await fn()
+            except Exception as e:
+                if attempt == self.retries or not self.retryable(e):
+                    raise
+                self.retried += 1
+                await asyncio.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "served": self.served,
+            "avg_wait_seconds": self.waited / self.served if self.served else 0.0,
+            "max_wait_seconds": self.max_wait,
+            "retried": self.retried,
+            "shed": self.shed
+        }
@@ -0,0 +1,81 @@
+import asyncio
+import discord
+
+# Discord rejects messages with more attachments than this
+MAX_ATTACHMENTS = 10
+
+# Collects level ups per level channel for a short window and posts them
+# together, one card per member, in as few messages as the attachment limit
+# allows. A member who levels up several times in one window gets a single
+# card spanning all of it.
+class LevelUpAnnouncer:
+    def __init__(self, card_gen, window=3.0):
+        self.card_gen = card_gen
+        self.window = window
+        self._pending = {}  # channel_id -> {user_id: [user, old_level, new_level, xp, max_xp, profile]}
+        self._channels = {}
+        self._tasks = {}  # channel_id -> task still waiting out its window
+        self._running = set()
+        self.queued = 0
+        self.sent_messages = 0
+
+    def announce(self, channel, user, old_level, new_level, xp, max_xp, profile=None):
+        pending = self._pending.setdefault(channel.id, {})
+        entry = pending.get(user.id)
+        if entry:
+            # Keep the level they started the window at
+            entry[2:] = [new_level, xp, max_xp, profile]
+        else:
+            pending[user.id] = [user, old_level, new_level, xp, max_xp, profile]
+        self.queued += 1
+
+        self._channels[channel.id] = channel
+        if channel.id not in self._tasks:
+            task = asyncio.create_task(self._send_later(channel.id))
+            self._tasks[channel.id] = task
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _send_later(self, channel_id):
+        await asyncio.sleep(self.window)
+        del self._tasks[channel_id]
+        await self._send(channel_id)
+
+    async def _send(self, channel_id):
+        channel = self._channels.pop(channel_id)
+        entries = list(self._pending.pop(channel_id).values())
+
+        for i in range(0, len(entries), MAX_ATTACHMENTS):
+            chunk = entries[i:i + MAX_ATTACHMENTS]
+            # A card that fails to render doesn't hold back the others, its
+            # member is still mentioned
+            results = await asyncio.gather(*(
+                self.card_gen.generate_level_up_card(user, old_level, new_level, xp, max_xp, profile=profile)
+                for user, old_level, new_level, xp, max_xp, profile in chunk
+            ), return_exceptions=True)
+            cards = []
+            for (user, *_), result in zip(chunk, results):
+                if isinstance(result, Exception):
+                    print(f"Error rendering level up card for {user.id}: {result}")
+                else:
+                    cards.append(result)
+
+            try:
+                await channel.send(
+                    "\n".join(f"🎉 {user.mention} leveled up to level {new_level}!" for user, _, new_level, *_ in chunk),
+                    files=cards
+                )
+                self.sent_messages += 1
+            except discord.HTTPException as e:
+                print(f"Error announcing level ups in {channel_id}: {e}")
+
+    async def flush(self):
+        # Send everything that is still waiting and let running sends finish,
+        # used on shutdown
+        for channel_id in list(self._tasks):
+            self._tasks.pop(channel_id).cancel()
+            try:
+                await self._send(channel_id)
+            except Exception as e:
+                print(f"Error announcing level ups in {channel_id}: {e}")
+        await asyncio.gather(*self._running, return_exceptions=True)
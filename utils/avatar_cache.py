@@ -0,0 +1,196 @@
+import asyncio
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from io import BytesIO
+from PIL import Image, ImageChops, ImageDraw
+
+@lru_cache(maxsize=None)
+def circle_mask(size):
+    mask = Image.new('L', (size, size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size, size), fill=255)
+    return mask
+
+def prepare_avatar(avatar_bytes, size):
+    # Runs on a render worker: decode, resize and cut the avatar into a
+    # circle. Returns raw RGBA bytes, or None if the image can't be read.
+    try:
+        avatar = Image.open(BytesIO(avatar_bytes)).convert("RGBA")
+    except:
+        return None
+    avatar = avatar.resize((size, size))
+    avatar.putalpha(ImageChops.multiply(avatar.getchannel("A"), circle_mask(size)))
+    return avatar.tobytes()
+
+def _asset_size(size):
+    # Discord serves avatars in powers of two, fetch the smallest that fits
+    asset_size = 16
+    while asset_size < size:
+        asset_size *= 2
+    return asset_size
+
+# Ready-to-paste avatars keyed by Discord avatar hash and size, so a changed
+# avatar simply misses. Entries are kept in an LRU bounded by total bytes and,
+# if a directory is given, on disk as PNG so they survive restarts. The disk
+# copy is bounded by max_disk_bytes too, least recently used files go first.
+class AvatarCache:
+    def __init__(self, pool, max_bytes=32 * 1024 * 1024, directory=None, max_disk_bytes=256 * 1024 * 1024):
+        self.pool = pool
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # key -> raw RGBA bytes
+        self._disk = OrderedDict()  # key -> file size, least recently used first
+        self._inflight = {}  # key -> task loading the avatar
+        self.size = 0
+        self.disk_size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.disk_evictions = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load_disk()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _load_disk(self):
+        # Picks up what earlier runs left, oldest use first, and trims it to
+        # the budget. Files of the old raw format are dropped.
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            name, ext = os.path.splitext(entry.name)
+            try:
+                if ext != ".png":
+                    os.remove(entry.path)
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, name, stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self.disk_size += size
+        self._remove_files(self._evict_disk())
+
+    def _evict_disk(self):
+        evicted = []
+        while self.disk_size > self.max_disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self.disk_size -= size
+            self.disk_evictions += 1
+            evicted.append(key)
+        return evicted
+
+    def _remove_files(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _read_disk(self, key, size):
+        try:
+            with Image.open(self._path(key)) as avatar:
+                if avatar.mode != "RGBA" or avatar.size != (size, size):
+                    return None
+                data = avatar.tobytes()
+            # Marks it used for eviction after restarts
+            os.utime(self._path(key))
+            return data
+        except (OSError, SyntaxError, ValueError):
+            return None
+
+    def _write_disk(self, key, data, size):
+        # Returns the file size, or None if it couldn't be written
+        try:
+            Image.frombytes("RGBA", (size, size), data).save(self._path(key), "PNG")
+            return os.path.getsize(self._path(key))
+        except OSError as e:
+            print(f"Error caching avatar {key}: {e}")
+            return None
+
+    async def _store_disk(self, key, data, size):
+        file_size = await asyncio.to_thread(self._write_disk, key, data, size)
+        if file_size is None:
+            return
+        self.disk_size += file_size - self._disk.pop(key, 0)
+        self._disk[key] = file_size
+        evicted = self._evict_disk()
+        if evicted:
+            await asyncio.to_thread(self._remove_files, evicted)
+
+    def _remember(self, key, data):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+
+        self._memory[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self.size -= len(evicted)
+
+    async def get(self, user, size):
+        # Returns the avatar as size x size raw RGBA bytes, or None
+        key = f"{user.display_avatar.key}_{size}"
+
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return data
+
+        # Concurrent misses for the same avatar share one load, which runs on
+        # its own so a caller giving up doesn't cancel it for the others
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._load(user, key, size))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _load(self, user, key, size):
+        if self.directory and key in self._disk:
+            data = await asyncio.to_thread(self._read_disk, key, size)
+            if data is not None:
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self.disk_hits += 1
+                self._remember(key, data)
+                return data
+
+        self.misses += 1
+        try:
+            avatar_bytes = await user.display_avatar.with_size(_asset_size(size)).read()
+        except:
+            return None
+
+        data = await self.pool.run(prepare_avatar, avatar_bytes, size)
+        if data is None:
+            return None
+
+        self._remember(key, data)
+        if self.directory:
+            await self._store_disk(key, data, size)
+        return data
+
+    def stats(self):
+        return {
+            "entries": len(self._memory),
+            "bytes": self.size,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self.disk_size,
+            "disk_evictions": self.disk_evictions,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced
+        }
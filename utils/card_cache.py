@@ -0,0 +1,53 @@
+from collections import OrderedDict
+
+# Encoded cards keyed by everything that affects the image, in an LRU
+# bounded by total bytes. Each entry remembers how long it took to render
+# so hits can report the time they saved.
+class CardCache:
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._cards = OrderedDict()  # key -> (data, render_seconds)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0
+
+    def get(self, key):
+        entry = self._cards.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._cards.move_to_end(key)
+        self.hits += 1
+        self.saved += entry[1]
+        return entry[0]
+
+    def put(self, key, data, render_seconds):
+        if len(data) > self.max_bytes:
+            return
+
+        old = self._cards.pop(key, None)
+        if old is not None:
+            self.size -= len(old[0])
+
+        self._cards[key] = (data, render_seconds)
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, (evicted, _) = self._cards.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self):
+        self._cards.clear()
+        self.size = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cards),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved
+        }
@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict, deque
+
+# Rough token count, about four characters per token plus the per-message
+# overhead of the chat format. Close enough to keep requests under budget
+# without pulling in a tokenizer.
+def estimate_tokens(text):
+    return len(text) // 4 + 4
+
+class Conversation:
+    __slots__ = ("turns", "last_used")
+
+    def __init__(self, max_turns):
+        self.turns = deque(maxlen=max_turns)  # (role, content, tokens), oldest drop off first
+        self.last_used = time.monotonic()
+
+# Recent turns of each (channel, user) conversation. Every conversation is a
+# ring buffer of its last few messages, and the conversations themselves sit
+# in an LRU that drops them once idle for longer than the TTL or when there
+# are too many, so memory stays bounded however many members chat.
+class ConversationStore:
+    def __init__(self, max_turns=10, token_budget=1500, ttl=900, max_conversations=10_000):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.ttl = ttl
+        self.max_conversations = max_conversations
+        self._conversations = OrderedDict()  # (channel_id, user_id) -> Conversation
+        self.evicted = 0
+
+    def _get(self, key):
+        conversation = self._conversations.get(key)
+        if conversation and time.monotonic() - conversation.last_used > self.ttl:
+            del self._conversations[key]
+            self.evicted += 1
+            return None
+        return conversation
+
+    def __contains__(self, key):
+        return self._get(key) is not None
+
+    def build_messages(self, key, prompt):
+        # The prompt is always sent, then as much history as fits the budget,
+        # newest first
+        budget = self.token_budget - estimate_tokens(prompt)
+        history = []
+        conversation = self._get(key)
+        if conversation:
+            for role, content, tokens in reversed(conversation.turns):
+                if tokens > budget:
+                    break
+                budget -= tokens
+                history.append({"role": role, "content": content})
+            # Don't open the request with a reply to a question that was cut
+            if history and history[-1]["role"] == "assistant":
+                history.pop()
+        history.reverse()
+        history.append({"role": "user", "content": prompt})
+        return history
+
+    def record(self, key, prompt, reply):
+        conversation = self._get(key)
+        if conversation is None:
+            conversation = self._conversations[key] = Conversation(self.max_turns)
+        else:
+            self._conversations.move_to_end(key)
+
+        conversation.turns.append(("user", prompt, estimate_tokens(prompt)))
+        conversation.turns.append(("assistant", reply, estimate_tokens(reply)))
+        conversation.last_used = time.monotonic()
+        self.sweep()
+
+    def forget(self, key):
+        self._conversations.pop(key, None)
+
+    def sweep(self):
+        # LRU order is also last-used order, so expired conversations are all
+        # at the front
+        now = time.monotonic()
+        while self._conversations:
+            key, conversation = next(iter(self._conversations.items()))
+            if len(self._conversations) <= self.max_conversations and now - conversation.last_used <= self.ttl:
+                break
+            del self._conversations[key]
+            self.evicted += 1
+
+    def stats(self):
+        return {
+            "conversations": len(self._conversations),
+            "turns": sum(len(c.turns) for c in self._conversations.values()),
+            "evicted": self.evicted
+        }
@@ -0,0 +1,304 @@
+import sqlite3
+from sqlite3 import Error
+import config
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS guilds (
+        guild_id INTEGER PRIMARY KEY,
+        yt_verify_channel INTEGER,
+        yt_verify_role INTEGER,
+        suggestions_channel INTEGER,
+        level_channel INTEGER,
+        ai_channel INTEGER,
+        yt_notify_channel INTEGER,
+        card_format TEXT,
+        ai_cache INTEGER
+    )""",
+    # Which guilds follow which YouTube channel
+    """CREATE TABLE IF NOT EXISTS youtube_subscriptions (
+        channel_id TEXT,
+        guild_id INTEGER,
+        PRIMARY KEY (channel_id, guild_id),
+        FOREIGN KEY (guild_id) REFERENCES guilds (guild_id)
+    )""",
+    # One row per followed YouTube channel, however many guilds follow it
+    """CREATE TABLE IF NOT EXISTS youtube_channel_state (
+        channel_id TEXT PRIMARY KEY,
+        channel_name TEXT,
+        last_video_id TEXT,
+        last_published REAL
+    )""",
+    """CREATE TABLE IF NOT EXISTS suggestions (
+        message_id INTEGER PRIMARY KEY,
+        guild_id INTEGER,
+        author_id INTEGER,
+        content TEXT,
+        upvotes INTEGER DEFAULT 0,
+        downvotes INTEGER DEFAULT 0,
+        FOREIGN KEY (guild_id) REFERENCES guilds (guild_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS levels (
+        user_id INTEGER,
+        guild_id INTEGER,
+        xp INTEGER DEFAULT 0,
+        level INTEGER DEFAULT 1,
+        last_message TIMESTAMP,
+        PRIMARY KEY (user_id, guild_id)
+    )""",
+    # Lets rank queries seek instead of scanning the whole guild
+    """CREATE INDEX IF NOT EXISTS idx_levels_rank
+        ON levels (guild_id, level DESC, xp DESC)""",
+    """CREATE TABLE IF NOT EXISTS votes (
+        user_id INTEGER,
+        suggestion_id INTEGER,
+        vote_type INTEGER,  -- 1 for upvote, -1 for downvote
+        PRIMARY KEY (user_id, suggestion_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS yt_verifications (
+        user_id INTEGER,
+        guild_id INTEGER,
+        status TEXT,  -- 'pending', 'approved', 'rejected'
+        proof_url TEXT,
+        timestamp TIMESTAMP,
+        PRIMARY KEY (user_id, guild_id)
+    )"""
+]
+
+# Columns added after their table was first released, so older databases get
+# them too: (table, column, definition)
+COLUMNS = [
+    ("guilds", "card_format", "TEXT"),
+    ("guilds", "ai_cache", "INTEGER"),
+    ("youtube_channel_state", "last_published", "REAL")
+]
+
+# Tables replaced by newer ones: (old table, statements moving its rows to
+# the new tables). The old table is dropped once its rows are moved.
+TABLE_MIGRATIONS = [
+    ("youtube_channels", [
+        """INSERT OR IGNORE INTO youtube_subscriptions (channel_id, guild_id)
+            SELECT channel_id, guild_id FROM youtube_channels""",
+        """INSERT OR IGNORE INTO youtube_channel_state (channel_id, last_video_id)
+            SELECT channel_id, last_video_id FROM youtube_channels"""
+    ])
+]
+
+# Long-lived SQLite connections driven from worker threads so no query ever
+# blocks the event loop. All writes go through one dedicated writer thread,
+# reads are spread over a small pool of read-only connections. WAL mode lets
+# readers run alongside the writer, and every connection keeps a cache of
+# prepared statements so repeated queries skip the SQL compiler.
+class Database:
+    def __init__(self, path, readers=4, statement_cache=128):
+        self.path = path
+        self.readers = readers
+        self.statement_cache = statement_cache
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._writer = None
+        self._reader_pool = None
+
+    def _connect(self, read_only=False):
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=self.statement_cache
+        )
+        conn.execute("PRAGMA busy_timeout=5000")
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        else:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _init_writer(self):
+        self._local.conn = self._connect()
+
+    def _init_reader(self):
+        self._local.conn = self._connect(read_only=True)
+
+    def _run(self, executor, fn):
+        if executor is None:
+            raise RuntimeError("Database is not connected")
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(executor, lambda: fn(self._local.conn))
+
+    async def connect(self):
+        if self._writer is not None:
+            return
+
+        self._writer = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="db-writer",
+            initializer=self._init_writer
+        )
+        # The writer has to create the schema and switch on WAL before any
+        # reader opens the file.
+        await self._run(self._writer, self._initialize)
+
+        self._reader_pool = ThreadPoolExecutor(
+            max_workers=self.readers,
+            thread_name_prefix="db-reader",
+            initializer=self._init_reader
+        )
+
+    @staticmethod
+    def _initialize(conn):
+        with conn:
+            for command in SCHEMA:
+                conn.execute(command)
+            for table, column, definition in COLUMNS:
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            for table, statements in TABLE_MIGRATIONS:
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone():
+                    for statement in statements:
+                        conn.execute(statement)
+                    conn.execute(f"DROP TABLE {table}")
+
+    async def close(self):
+        writer, readers = self._writer, self._reader_pool
+        self._writer = self._reader_pool = None
+
+        loop = asyncio.get_running_loop()
+        for executor in (readers, writer):
+            if executor is not None:
+                await loop.run_in_executor(None, executor.shutdown)
+
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    # Reads
+
+    async def fetchone(self, sql, params=()):
+        return await self._run(self._reader_pool, lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql, params=()):
+        return await self._run(self._reader_pool, lambda conn: conn.execute(sql, params).fetchall())
+
+    # Writes
+
+    async def execute(self, sql, params=()):
+        def _execute(conn):
+            with conn:
+                return conn.execute(sql, params).rowcount
+        return await self._run(self._writer, _execute)
+
+    async def executemany(self, sql, seq_of_params):
+        def _executemany(conn):
+            with conn:
+                return conn.executemany(sql, seq_of_params).rowcount
+        return await self._run(self._writer, _executemany)
+
+    async def transaction(self, fn, *args):
+        # Runs fn(conn, *args) on the writer thread inside one transaction
+        def _transaction(conn):
+            with conn:
+                return fn(conn, *args)
+        return await self._run(self._writer, _transaction)
+
+db = Database(config.DB_PATH, readers=config.DB_READERS, statement_cache=config.DB_STATEMENT_CACHE)
+
+# Row of the guilds table, in column order
+class GuildConfig(NamedTuple):
+    guild_id: int
+    yt_verify_channel: Optional[int] = None
+    yt_verify_role: Optional[int] = None
+    suggestions_channel: Optional[int] = None
+    level_channel: Optional[int] = None
+    ai_channel: Optional[int] = None
+    yt_notify_channel: Optional[int] = None
+    card_format: Optional[str] = None
+    ai_cache: Optional[int] = None
+
+# Process-wide copy of the guilds table. It is filled once at startup and
+# every write goes through update_guild_config, so lookups never need to
+# touch the database afterwards. Guilds without a row are cached as None.
+class GuildConfigCache:
+    def __init__(self):
+        self._configs = {}
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    async def load(self):
+        rows = await db.fetchall("SELECT * FROM guilds")
+        self._configs = {row[0]: GuildConfig(*row) for row in rows}
+        self.loaded = True
+
+    async def get(self, guild_id):
+        if guild_id in self._configs or self.loaded:
+            self.hits += 1
+            return self._configs.get(guild_id)
+
+        # Not loaded yet, fall back to the database and remember the answer
+        self.misses += 1
+        row = await db.fetchone("SELECT * FROM guilds WHERE guild_id=?", (guild_id,))
+        self._configs[guild_id] = GuildConfig(*row) if row else None
+        return self._configs[guild_id]
+
+    def set(self, guild_config):
+        self._configs[guild_config.guild_id] = guild_config
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "guilds": sum(1 for c in self._configs.values() if c is not None),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+guild_configs = GuildConfigCache()
+
+# Database helper functions
+async def load_guild_configs():
+    await guild_configs.load()
+
+async def get_guild_config(guild_id):
+    try:
+        return await guild_configs.get(guild_id)
+    except Error as e:
+        print(f"Error getting guild config: {e}")
+        return None
+
+def _update_guild_config(conn, guild_id, kwargs):
+    c = conn.cursor()
+
+    # Check if guild exists
+    c.execute("SELECT 1 FROM guilds WHERE guild_id=?", (guild_id,))
+    exists = c.fetchone()
+
+    if exists:
+        # Update existing record
+        set_clause = ", ".join([f"{key}=?" for key in kwargs.keys()])
+        values = tuple(kwargs.values()) + (guild_id,)
+        c.execute(f"UPDATE guilds SET {set_clause} WHERE guild_id=?", values)
+    else:
+        # Insert new record
+        columns = ["guild_id"] + list(kwargs.keys())
+        placeholders = ", ".join(["?"] * len(columns))
+        values = (guild_id,) + tuple(kwargs.values())
+        c.execute(f"INSERT INTO guilds ({', '.join(columns)}) VALUES ({placeholders})", values)
+
+    # Hand the stored row back so the cache sees exactly what was committed
+    c.execute("SELECT * FROM guilds WHERE guild_id=?", (guild_id,))
+    return c.fetchone()
+
+async def update_guild_config(guild_id, **kwargs):
+    try:
+        row = await db.transaction(_update_guild_config, guild_id, kwargs)
+        guild_configs.set(GuildConfig(*row))
+    except Error as e:
+        print(f"Error updating guild config: {e}")
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from utils.database import get_guild_config
+
+# Per-handler latency, in seconds
+class HandlerStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, elapsed, failed=False):
+        self.calls += 1
+        self.errors += failed
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": self.total / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max * 1000
+        }
+
+# Single on_message listener shared by every cog. The guild config is
+# resolved once per message and only handlers whose feature is enabled in
+# that guild are called, with (message, guild_config).
+class MessageDispatcher:
+    def __init__(self):
+        self._handlers = {}  # name -> (feature, handler)
+        self._stats = {}
+
+    def register(self, name, handler, feature):
+        # feature is the GuildConfig field that has to be set for the handler to run
+        self._handlers[name] = (feature, handler)
+        self._stats.setdefault(name, HandlerStats())
+
+    def unregister(self, name):
+        self._handlers.pop(name, None)
+
+    async def _run(self, name, handler, message, guild_config):
+        start = time.perf_counter()
+        failed = False
+        try:
+            await handler(message, guild_config)
+        except Exception as e:
+            failed = True
+            print(f"Error in message handler {name}: {e}")
+        finally:
+            self._stats[name].record(time.perf_counter() - start, failed)
+
+    async def on_message(self, message):
+        # Ignore bots and DMs
+        if message.author.bot or not message.guild:
+            return
+
+        guild_config = await get_guild_config(message.guild.id)
+        if not guild_config:
+            return
+
+        handlers = [
+            self._run(name, handler, message, guild_config)
+            for name, (feature, handler) in self._handlers.items()
+            if getattr(guild_config, feature)
+        ]
+        if handlers:
+            await asyncio.gather(*handlers)
+
+    def stats(self):
+        return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+dispatcher = MessageDispatcher()
@@ -1,125 +1,211 @@
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 import os
+import time
 import config
 from io import BytesIO
 import discord
+from utils.render_pool import RenderPool
+from utils.avatar_cache import AvatarCache
+from utils.card_cache import CardCache
 
-class CardGenerator:
+# Every font size the cards use
+FONT_SIZES = (24, 28, 36, 42)
+AVATAR_SIZE = 100
+
+# Progress bar geometry: (width, height, y, radius)
+LEVEL_BAR = (500, 20, 220, 10)
+RANK_BAR = (400, 15, 280, 7)
+
+def _bar_box(image, bar, progress=1.0):
+    bar_width, bar_height, bar_y, _ = bar
+    bar_x = (image.width - bar_width) // 2
+    return (bar_x, bar_y, bar_x + int(bar_width * progress), bar_y + bar_height)
+
+# Parts of each card that never change: the title and the empty progress bar
+
+def draw_level_up_static(image, fonts):
+    draw = ImageDraw.Draw(image)
+    draw.text((image.width//2, 50), "🎉 LEVEL UP!", fill="white", font=fonts[42], anchor="mm")
+    draw.rounded_rectangle(_bar_box(image, LEVEL_BAR), fill=(50, 50, 50), radius=LEVEL_BAR[3])
+
+def draw_rank_static(image, fonts):
+    draw = ImageDraw.Draw(image)
+    draw.text((image.width//2, 30), "🏆 USER STATS", fill="white", font=fonts[36], anchor="mm")
+    draw.rounded_rectangle(_bar_box(image, RANK_BAR), fill=(50, 50, 50), radius=RANK_BAR[3])
+
+# Decoded templates and parsed fonts, plus base layers with the static parts
+# already drawn in. Renders only add the dynamic parts to a copy of a base.
+class CardAssets:
     def __init__(self):
-        self.font_regular = config.FONT_REGULAR
-        
-    async def generate_level_up_card(self, user: discord.User, old_level: int, new_level: int, xp: int, max_xp: int):
-        # Load base image
-        base = Image.open(config.LEVEL_CARD)
-        draw = ImageDraw.Draw(base)
-        
-        # Load font
-        try:
-            title_font = ImageFont.truetype(self.font_regular, 42)
-            name_font = ImageFont.truetype(self.font_regular, 36)
-            xp_font = ImageFont.truetype(self.font_regular, 28)
-        except:
-            # Fallback if font fails
-            title_font = ImageFont.load_default()
-            name_font = ImageFont.load_default()
-            xp_font = ImageFont.load_default()
-        
-        # Draw text
-        draw.text((base.width//2, 50), "🎉 LEVEL UP!", fill="white", font=title_font, anchor="mm")
-        draw.text((base.width//2, 120), f"{user.display_name}", fill="white", font=name_font, anchor="mm")
-        draw.text((base.width//2, 170), f"🏆 Level {old_level} → {new_level}", fill="white", font=xp_font, anchor="mm")
-        
-        # Progress bar
-        progress = xp / max_xp
-        bar_width = 500
-        bar_height = 20
-        bar_x = (base.width - bar_width) // 2
-        bar_y = 220
-        
-        # Draw background bar
-        draw.rounded_rectangle((bar_x, bar_y, bar_x + bar_width, bar_y + bar_height), 
-                              fill=(50, 50, 50), radius=10)
-        
-        # Draw progress
-        draw.rounded_rectangle((bar_x, bar_y, bar_x + int(bar_width * progress), bar_y + bar_height), 
-                              fill=(88, 101, 242), radius=10)
-        
-        # Draw percentage text
-        draw.text((base.width//2, bar_y + bar_height + 10), 
-                 f"{int(progress * 100)}%", fill="white", font=xp_font, anchor="mm")
-        
-        # Save to bytes
-        buffer = BytesIO()
-        base.save(buffer, format="PNG")
-        buffer.seek(0)
-        
-        return discord.File(buffer, filename="levelup.png")
-    
-    async def generate_rank_card(self, user: discord.User, xp: int, level: int, max_xp: int, rank: int):
-        # Load base image
-        base = Image.open(config.RANK_CARD)
-        draw = ImageDraw.Draw(base)
-        
-        # Load font
+        with Image.open(config.LEVEL_CARD) as image:
+            self.level_template = image.copy()
+        with Image.open(config.RANK_CARD) as image:
+            self.rank_template = image.copy()
+
         try:
-            title_font = ImageFont.truetype(self.font_regular, 36)
-            name_font = ImageFont.truetype(self.font_regular, 32)
-            stats_font = ImageFont.truetype(self.font_regular, 24)
-        except:
+            self.fonts = {size: ImageFont.truetype(config.FONT_REGULAR, size) for size in FONT_SIZES}
+        except OSError:
             # Fallback if font fails
-            title_font = ImageFont.load_default()
-            name_font = ImageFont.load_default()
-            stats_font = ImageFont.load_default()
-        
-        # Draw text
-        draw.text((base.width//2, 30), "🏆 USER STATS", fill="white", font=title_font, anchor="mm")
-        
-        # User avatar
-        avatar_size = 100
-        avatar = await self._get_user_avatar(user, avatar_size)
-        if avatar:
-            avatar = avatar.resize((avatar_size, avatar_size))
-            mask = Image.new('L', (avatar_size, avatar_size), 0)
-            draw_mask = ImageDraw.Draw(mask)
-            draw_mask.ellipse((0, 0, avatar_size, avatar_size), fill=255)
-            base.paste(avatar, ((base.width - avatar_size) // 2, 70), mask)
-        
-        # Stats
-        draw.text((base.width//2, 180), f"✨ XP: {xp:,}/{max_xp:,}", fill="white", font=stats_font, anchor="mm")
-        draw.text((base.width//2, 210), f"⚡ Level: {level}", fill="white", font=stats_font, anchor="mm")
-        draw.text((base.width//2, 240), f"🏅 Rank: #{rank}", fill="white", font=stats_font, anchor="mm")
-        
-        # Progress bar
-        progress = xp / max_xp
-        bar_width = 400
-        bar_height = 15
-        bar_x = (base.width - bar_width) // 2
-        bar_y = 280
-        
-        # Draw background bar
-        draw.rounded_rectangle((bar_x, bar_y, bar_x + bar_width, bar_y + bar_height), 
-                              fill=(50, 50, 50), radius=7)
-        
-        # Draw progress
-        draw.rounded_rectangle((bar_x, bar_y, bar_x + int(bar_width * progress), bar_y + bar_height), 
-                              fill=(88, 101, 242), radius=7)
-        
-        # Draw progress characters
-        filled = int(10 * progress)
-        progress_text = "■" * filled + "□" * (10 - filled)
-        draw.text((base.width//2, bar_y + bar_height + 10), 
-                 progress_text, fill="white", font=stats_font, anchor="mm")
-        
-        # Save to bytes
-        buffer = BytesIO()
-        base.save(buffer, format="PNG")
-        buffer.seek(0)
-        
-        return discord.File(buffer, filename="rank.png")
-    
-    async def _get_user_avatar(self, user: discord.User, size: int):
-        try:
-            avatar_bytes = await user.display_avatar.read()
-            return Image.open(BytesIO(avatar_bytes))
-        except:
-            return None
\ No newline at end of file
+            default = ImageFont.load_default()
+            self.fonts = {size: default for size in FONT_SIZES}
+
+        self.level_base = self.level_template.copy()
+        draw_level_up_static(self.level_base, self.fonts)
+        self.rank_base = self.rank_template.copy()
+        draw_rank_static(self.rank_base, self.fonts)
+
+# Assets of the current process, render workers each load their own
+_assets = None
+
+def load_assets():
+    global _assets
+    _assets = CardAssets()
+
+def _get_assets():
+    if _assets is None:
+        load_assets()
+    return _assets
+
+# Output encodings for finished cards: profile -> (file extension, save options)
+OUTPUT_PROFILES = {
+    "png": ("png", {"format": "PNG"}),
+    "png_optimized": ("png", {"format": "PNG", "optimize": True}),
+    "png_palette": ("png", {"format": "PNG", "optimize": True}),
+    "webp_lossless": ("webp", {"format": "WEBP", "lossless": True, "quality": 50, "method": 0}),
+    "webp": ("webp", {"format": "WEBP", "quality": config.CARD_WEBP_QUALITY, "method": 4})
+}
+
+def encode_card(image, profile="png"):
+    extension, options = OUTPUT_PROFILES.get(profile, OUTPUT_PROFILES["png"])
+    if profile == "png_palette":
+        image = image.convert("RGB").quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+
+    buffer = BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+def card_filename(name, profile):
+    extension, _ = OUTPUT_PROFILES.get(profile, OUTPUT_PROFILES["png"])
+    return f"{name}.{extension}"
+
+# The render functions run in a worker, so they take and return plain data only
+
+def draw_level_up(image, fonts, display_name, old_level, new_level, xp, max_xp):
+    draw = ImageDraw.Draw(image)
+
+    # Draw text
+    draw.text((image.width//2, 120), f"{display_name}", fill="white", font=fonts[36], anchor="mm")
+    draw.text((image.width//2, 170), f"🏆 Level {old_level} → {new_level}", fill="white", font=fonts[28], anchor="mm")
+
+    # Draw progress
+    progress = xp / max_xp
+    draw.rounded_rectangle(_bar_box(image, LEVEL_BAR, progress), fill=(88, 101, 242), radius=LEVEL_BAR[3])
+
+    # Draw percentage text
+    bar_width, bar_height, bar_y, _ = LEVEL_BAR
+    draw.text((image.width//2, bar_y + bar_height + 10),
+             f"{int(progress * 100)}%", fill="white", font=fonts[28], anchor="mm")
+
+def draw_rank(image, fonts, xp, level, max_xp, rank, avatar=None):
+    draw = ImageDraw.Draw(image)
+
+    # User avatar, already resized and masked into a circle
+    if avatar:
+        avatar = Image.frombytes("RGBA", (AVATAR_SIZE, AVATAR_SIZE), avatar)
+        image.paste(avatar, ((image.width - AVATAR_SIZE) // 2, 70), avatar)
+
+    # Stats
+    stats_font = fonts[24]
+    draw.text((image.width//2, 180), f"✨ XP: {xp:,}/{max_xp:,}", fill="white", font=stats_font, anchor="mm")
+    draw.text((image.width//2, 210), f"⚡ Level: {level}", fill="white", font=stats_font, anchor="mm")
+    draw.text((image.width//2, 240), f"🏅 Rank: #{rank}", fill="white", font=stats_font, anchor="mm")
+
+    # Draw progress
+    progress = xp / max_xp
+    draw.rounded_rectangle(_bar_box(image, RANK_BAR, progress), fill=(88, 101, 242), radius=RANK_BAR[3])
+
+    # Draw progress characters
+    bar_width, bar_height, bar_y, _ = RANK_BAR
+    filled = int(10 * progress)
+    progress_text = "■" * filled + "□" * (10 - filled)
+    draw.text((image.width//2, bar_y + bar_height + 10),
+             progress_text, fill="white", font=stats_font, anchor="mm")
+
+def render_level_up_card(display_name: str, old_level: int, new_level: int, xp: int, max_xp: int, profile: str = "png") -> bytes:
+    assets = _get_assets()
+    base = assets.level_base.copy()
+    draw_level_up(base, assets.fonts, display_name, old_level, new_level, xp, max_xp)
+    return encode_card(base, profile)
+
+def render_rank_card(display_name: str, xp: int, level: int, max_xp: int, rank: int, avatar: bytes = None, profile: str = "png") -> bytes:
+    assets = _get_assets()
+    base = assets.rank_base.copy()
+    draw_rank(base, assets.fonts, xp, level, max_xp, rank, avatar)
+    return encode_card(base, profile)
+
+class CardGenerator:
+    def __init__(self):
+        self.pool = RenderPool(
+            workers=config.RENDER_WORKERS,
+            max_queue=config.RENDER_QUEUE_SIZE,
+            use_processes=config.RENDER_USE_PROCESSES,
+            initializer=load_assets
+        )
+        self.avatars = AvatarCache(
+            self.pool,
+            max_bytes=config.AVATAR_CACHE_BYTES,
+            directory=config.AVATAR_CACHE_DIR,
+            max_disk_bytes=config.AVATAR_DISK_BYTES
+        )
+        self.cards = CardCache(max_bytes=config.CARD_CACHE_BYTES)
+        self.template_version = 0
+
+    def reload_assets(self):
+        # Picks up changed theme files without a restart. Workers load the
+        # assets again when they are next started.
+        load_assets()
+        self.pool.restart()
+        self.template_version += 1
+        self.cards.clear()
+
+    def close(self):
+        self.pool.close()
+
+    async def _render(self, fn, *args):
+        start = time.perf_counter()
+        data = await self.pool.run(fn, *args)
+        return data, time.perf_counter() - start
+
+    # profile picks one of OUTPUT_PROFILES, None means config.CARD_FORMAT
+    async def generate_level_up_card(self, user: discord.User, old_level: int, new_level: int, xp: int, max_xp: int, profile: str = None):
+        profile = profile or config.CARD_FORMAT
+        key = ("levelup", user.display_name, old_level, new_level, xp, max_xp, profile, self.template_version)
+        data = self.cards.get(key)
+        if data is None:
+            data, elapsed = await self._render(
+                render_level_up_card, user.display_name, old_level, new_level, xp, max_xp, profile
+            )
+            self.cards.put(key, data, elapsed)
+        return discord.File(BytesIO(data), filename=card_filename("levelup", profile))
+
+    async def generate_rank_card(self, user: discord.User, xp: int, level: int, max_xp: int, rank: int, profile: str = None):
+        profile = profile or config.CARD_FORMAT
+        key = (
+            "rank", user.id, user.display_name, user.display_avatar.key,
+            xp, level, max_xp, rank, profile, self.template_version
+        )
+        data = self.cards.get(key)
+        if data is None:
+            avatar = await self.avatars.get(user, AVATAR_SIZE)
+            data, elapsed = await self._render(
+                render_rank_card, user.display_name, xp, level, max_xp, rank, avatar, profile
+            )
+            self.cards.put(key, data, elapsed)
+        return discord.File(BytesIO(data), filename=card_filename("rank", profile))
+
+    def stats(self):
+        return {
+            "cards": self.cards.stats(),
+            "avatars": self.avatars.stats(),
+            "render_pool": {"mode": self.pool.mode, "in_flight": self.pool.in_flight}
+        }
@@ -0,0 +1,126 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from utils.database import db
+
+# Leaderboard rows are (level, xp, user_id) and run highest first. Keys are
+# the negated row so the cached list can be kept ascending with bisect.
+def _key(row):
+    level, xp, user_id = row
+    return (-level, -xp, -user_id)
+
+def _row(key):
+    return (-key[0], -key[1], -key[2])
+
+# Exact copy of the first `limit` leaderboard rows of one guild
+class GuildLeaderboard:
+    def __init__(self, rows, limit):
+        self.limit = limit
+        self._keys = sorted(map(_key, rows))[:limit]
+        self._users = {-key[2]: key for key in self._keys}
+        # True when the cache holds every row of the guild
+        self.complete = len(rows) < limit
+
+    def update(self, user_id, level, xp):
+        old = self._users.pop(user_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, old)]
+
+        # Everyone ahead of the last cached row is cached, so the user only
+        # belongs in the cache if they now sort before it
+        key = _key((level, xp, user_id))
+        if self.complete or (self._keys and key < self._keys[-1]):
+            insort(self._keys, key)
+            self._users[user_id] = key
+            if len(self._keys) > self.limit:
+                del self._users[-self._keys.pop()[2]]
+                self.complete = False
+
+    def page(self, after, size):
+        # Rows following the `after` cursor, or None if they aren't all cached
+        start = 0 if after is None else bisect_right(self._keys, _key(after))
+        keys = self._keys[start:start + size]
+        if len(keys) < size and not self.complete:
+            return None
+        return [_row(key) for key in keys]
+
+    def extend(self, after, rows, size):
+        # Append rows fetched from the database if they continue the cache
+        if after is not None and (not self._keys or _key(after) > self._keys[-1]):
+            return
+
+        tail = self._keys[-1] if self._keys else None
+        for row in rows:
+            key = _key(row)
+            if tail is not None and key <= tail:
+                continue
+            if len(self._keys) >= self.limit:
+                return
+            self._keys.append(key)
+            self._users[row[2]] = key
+
+        if len(rows) < size:
+            self.complete = True
+
+# Keyset-paginated leaderboard with the top pages of each guild kept in
+# memory. The cache is patched on every XP change, so flipping through the
+# top pages never touches the database.
+class LeaderboardCache:
+    def __init__(self, xp_buffer, page_size=10, pages=5):
+        self.xp_buffer = xp_buffer
+        self.page_size = page_size
+        self.limit = page_size * pages
+        self._boards = {}
+        self._versions = defaultdict(int)  # Bumped on every change per guild
+        self.hits = 0
+        self.misses = 0
+        xp_buffer.listeners.append(self.update)
+
+    def update(self, guild_id, user_id, xp, level):
+        self._versions[guild_id] += 1
+        board = self._boards.get(guild_id)
+        if board is not None:
+            board.update(user_id, level, xp)
+
+    async def _fetch(self, guild_id, after, limit):
+        if after is None:
+            return await db.fetchall("""
+                SELECT level, xp, user_id FROM levels
+                WHERE guild_id=?
+                ORDER BY level DESC, xp DESC, user_id DESC
+                LIMIT ?
+            """, (guild_id, limit))
+
+        return await db.fetchall("""
+            SELECT level, xp, user_id FROM levels
+            WHERE guild_id=? AND (level, xp, user_id) < (?, ?, ?)
+            ORDER BY level DESC, xp DESC, user_id DESC
+            LIMIT ?
+        """, (guild_id, *after, limit))
+
+    async def page(self, guild_id, after=None):
+        # Returns up to page_size rows following the `after` cursor, which is
+        # the last row of the previous page
+        board = self._boards.get(guild_id)
+        if board is not None:
+            rows = board.page(after, self.page_size)
+            if rows is not None:
+                self.hits += 1
+                return rows
+
+        self.misses += 1
+
+        # Anything that changes while we read makes the result unsafe to cache
+        version = self._versions[guild_id]
+        await self.xp_buffer.flush()
+
+        if board is None and after is None:
+            rows = await self._fetch(guild_id, None, self.limit)
+            if self._versions[guild_id] == version:
+                self._boards[guild_id] = GuildLeaderboard(rows, self.limit)
+            return rows[:self.page_size]
+
+        rows = await self._fetch(guild_id, after, self.page_size)
+        board = self._boards.get(guild_id)
+        if board is not None and self._versions[guild_id] == version:
+            board.extend(after, rows, self.page_size)
+        return rows
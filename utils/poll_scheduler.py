@@ -0,0 +1,168 @@
+import heapq
+import random
+import time
+
+class ChannelCadence:
+    __slots__ = ("uploads", "boost_until")
+
+    def __init__(self):
+        self.uploads = []  # Recent upload times, oldest first
+        self.boost_until = 0.0
+
+# Decides when each YouTube channel is checked next. A channel is checked
+# about checks_per_upload times per typical gap between its uploads, so
+# frequent uploaders are checked often and dormant ones rarely, always
+# within min_interval and max_interval. Right after an upload a channel is
+# checked at min_interval for a while since follow-ups often come quickly.
+# Every interval gets some random jitter so checks spread out, and no more
+# than budget_per_minute checks are handed out per minute however many
+# channels there are; when over budget the most overdue go first. Channels
+# marked as pushed get their uploads some other way and are only checked at
+# max_interval as a safety net.
+class PollScheduler:
+    def __init__(self, min_interval=300, max_interval=21600, default_interval=600,
+                 checks_per_upload=48, boost_window=3600, jitter=0.2, budget_per_minute=60,
+                 history=10):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.checks_per_upload = checks_per_upload
+        self.boost_window = boost_window
+        self.jitter = jitter
+        self.budget_per_minute = budget_per_minute
+        self.history = history
+        self._heap = []  # (next_check, channel_id), may hold outdated entries
+        self._next = {}  # channel_id -> next_check, the real schedule
+        self._cadence = {}
+        self._pushed = set()
+        self._tokens = budget_per_minute
+        self._refilled = time.time()
+        self.checks = 0
+        self.deferred = 0
+
+    def __contains__(self, channel_id):
+        return channel_id in self._next
+
+    def __len__(self):
+        return len(self._next)
+
+    def add(self, channel_id, delay=None):
+        # New channels start somewhere within the default interval so a
+        # batch of them doesn't come due at once
+        if channel_id in self._next:
+            return
+        self._cadence[channel_id] = ChannelCadence()
+        if delay is None:
+            delay = random.uniform(0, self.default_interval)
+        self._schedule(channel_id, time.time() + delay)
+
+    def remove(self, channel_id):
+        self._next.pop(channel_id, None)
+        self._cadence.pop(channel_id, None)
+        self._pushed.discard(channel_id)
+
+    def channels(self):
+        return list(self._next)
+
+    def set_pushed(self, channel_id, pushed):
+        if pushed:
+            self._pushed.add(channel_id)
+        elif channel_id in self._pushed:
+            # Pushes stopped, back to polling without waiting out max_interval
+            self._pushed.discard(channel_id)
+            self.check_soon(channel_id)
+
+    def check_soon(self, channel_id):
+        if channel_id in self._next:
+            self._schedule(channel_id, time.time())
+
+    def sync(self, channel_ids):
+        # Track exactly these channels, keeping what is known about the rest
+        channel_ids = set(channel_ids)
+        for channel_id in self._next.keys() - channel_ids:
+            self.remove(channel_id)
+        for channel_id in channel_ids:
+            self.add(channel_id)
+
+    def knows(self, channel_id):
+        # Whether any upload times were seen for the channel yet
+        cadence = self._cadence.get(channel_id)
+        return bool(cadence and cadence.uploads)
+
+    def _schedule(self, channel_id, when):
+        self._next[channel_id] = when
+        heapq.heappush(self._heap, (when, channel_id))
+
+    def interval(self, channel_id, now=None):
+        now = now or time.time()
+        if channel_id in self._pushed:
+            return self.max_interval
+
+        cadence = self._cadence[channel_id]
+        if now < cadence.boost_until:
+            return self.min_interval
+
+        uploads = cadence.uploads
+        if not uploads:
+            interval = self.default_interval
+        else:
+            # Median gap between uploads, or how long it has been quiet
+            # when that is longer
+            gaps = sorted(b - a for a, b in zip(uploads, uploads[1:]))
+            typical = gaps[len(gaps) // 2] if gaps else 0
+            interval = max(typical, now - uploads[-1]) / self.checks_per_upload
+
+        interval *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def due(self):
+        # Channels to check now, each is already rescheduled for its next
+        # check so a failed check can't drop it from the schedule
+        now = time.time()
+        self._tokens = min(
+            self.budget_per_minute,
+            self._tokens + (now - self._refilled) * self.budget_per_minute / 60
+        )
+        self._refilled = now
+
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, channel_id = self._heap[0]
+            if self._next.get(channel_id) != when:
+                heapq.heappop(self._heap)  # Outdated or removed
+                continue
+            if self._tokens < 1:
+                self.deferred += 1
+                break
+            heapq.heappop(self._heap)
+            self._tokens -= 1
+            due.append(channel_id)
+            self._schedule(channel_id, now + self.interval(channel_id, now))
+
+        self.checks += len(due)
+        return due
+
+    def record(self, channel_id, uploads=(), new_upload=False):
+        # Feed the result of a check back: upload times it saw and whether
+        # any of them were new
+        cadence = self._cadence.get(channel_id)
+        if cadence is None:
+            return
+
+        now = time.time()
+        if uploads:
+            cadence.uploads = sorted(set(cadence.uploads).union(uploads))[-self.history:]
+        if new_upload:
+            cadence.boost_until = now + self.boost_window
+        self._schedule(channel_id, now + self.interval(channel_id, now))
+
+    def stats(self):
+        now = time.time()
+        return {
+            "channels": len(self._next),
+            "overdue": sum(1 for when in self._next.values() if when <= now),
+            "checks": self.checks,
+            "deferred": self.deferred,
+            "pushed": len(self._pushed),
+            "budget_per_minute": self.budget_per_minute
+        }
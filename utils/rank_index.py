@@ -0,0 +1,143 @@
+import asyncio
+from sqlite3 import Error
+from bisect import bisect_right, insort
+from utils.database import db
+
+# Fenwick tree counting members per level, grows as higher levels appear
+class LevelCounts:
+    def __init__(self, size=64):
+        self._counts = {}
+        self._tree = [0] * (size + 1)
+        self.total = 0
+
+    def add(self, level, delta):
+        if level >= len(self._tree):
+            self._grow(level)
+        self._counts[level] = self._counts.get(level, 0) + delta
+        self.total += delta
+        i = level
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _grow(self, level):
+        size = len(self._tree) - 1
+        while size <= level:
+            size *= 2
+        self._tree = [0] * (size + 1)
+        for lvl, count in self._counts.items():
+            i = lvl
+            while i < len(self._tree):
+                self._tree[i] += count
+                i += i & -i
+
+    def up_to(self, level):
+        # Members at or below the given level
+        i = min(level, len(self._tree) - 1)
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+# Order-statistic index over one guild's members. Members are ranked by
+# (level, xp), which is the same order as their total XP.
+class RankIndex:
+    def __init__(self):
+        self._members = {}  # user_id -> (level, xp)
+        self._levels = LevelCounts()
+        self._xp = {}  # level -> sorted xp values
+
+    def __len__(self):
+        return len(self._members)
+
+    def update(self, user_id, level, xp):
+        old = self._members.get(user_id)
+        if old == (level, xp):
+            return
+        if old:
+            self._discard(*old)
+
+        self._members[user_id] = (level, xp)
+        self._levels.add(level, 1)
+        insort(self._xp.setdefault(level, []), xp)
+
+    def remove(self, user_id):
+        old = self._members.pop(user_id, None)
+        if old:
+            self._discard(*old)
+
+    def _discard(self, level, xp):
+        self._levels.add(level, -1)
+        xps = self._xp[level]
+        del xps[bisect_right(xps, xp) - 1]
+        if not xps:
+            del self._xp[level]
+
+    def rank(self, level, xp):
+        # 1 + number of members strictly ahead of (level, xp)
+        above = self._levels.total - self._levels.up_to(level)
+        xps = self._xp.get(level, ())
+        return above + len(xps) - bisect_right(xps, xp) + 1
+
+# Per-guild rank indexes fed by the XP buffer. A guild's index is built from
+# the database the first time it is asked for, until then rank() answers
+# with a COUNT query backed by idx_levels_rank.
+class RankTracker:
+    def __init__(self, xp_buffer):
+        self.xp_buffer = xp_buffer
+        self._indexes = {}
+        self._loading = {}  # guild_id -> changes seen while the load runs
+        self._tasks = set()
+        xp_buffer.listeners.append(self.update)
+
+    def update(self, guild_id, user_id, xp, level):
+        if guild_id in self._indexes:
+            self._indexes[guild_id].update(user_id, level, xp)
+        elif guild_id in self._loading:
+            self._loading[guild_id][user_id] = (level, xp)
+
+    async def _load(self, guild_id):
+        changes = self._loading[guild_id]
+        # Buffered rows are newer than the database, later changes newer still
+        buffered = {
+            user_id: (level, xp)
+            for user_id, (xp, level) in self.xp_buffer.buffered(guild_id).items()
+        }
+        try:
+            rows = await db.fetchall(
+                "SELECT user_id, level, xp FROM levels WHERE guild_id=?", (guild_id,)
+            )
+        except Error as e:
+            print(f"Error building rank index for guild {guild_id}: {e}")
+            return
+        finally:
+            del self._loading[guild_id]
+
+        members = {user_id: (level, xp) for user_id, level, xp in rows}
+        members.update(buffered)
+        members.update(changes)
+
+        index = RankIndex()
+        for user_id, (level, xp) in members.items():
+            index.update(user_id, level, xp)
+        self._indexes[guild_id] = index
+
+    async def rank(self, guild_id, level, xp):
+        index = self._indexes.get(guild_id)
+        if index is not None:
+            return index.rank(level, xp)
+
+        if guild_id not in self._loading:
+            self._loading[guild_id] = {}
+            task = asyncio.create_task(self._load(guild_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        # Fallback while the index builds
+        await self.xp_buffer.flush()
+        (higher,) = await db.fetchone("""
+            SELECT COUNT(*) FROM levels
+            WHERE guild_id=? AND (level > ? OR (level = ? AND xp > ?))
+        """, (guild_id, level, level, xp))
+        return higher + 1
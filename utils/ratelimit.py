@@ -0,0 +1,94 @@
+import sys
+import time
+from collections import OrderedDict
+
+def member_key(guild_id, user_id):
+    # Snowflakes fit in 64 bits, so one int identifies a member of a guild
+    return (guild_id << 64) | user_id
+
+# Token bucket rate limiter: every key may spend `rate` hits per `per`
+# seconds, refilled continuously. A bucket that has refilled completely is
+# indistinguishable from a fresh one, so it is dropped by a timing wheel
+# sweep at that point. Buckets are also kept in LRU order and the least
+# recently used one is evicted once max_keys is reached.
+class RateLimiter:
+    def __init__(self, rate, per, max_keys=100_000, resolution=1.0):
+        self.capacity = rate
+        self.per = per
+        self.fill_rate = rate / per
+        self.max_keys = max_keys
+        self.resolution = resolution
+
+        self._buckets = OrderedDict()  # key -> [tokens, updated, expires]
+        self._wheel = [[] for _ in range(int(per / resolution) + 2)]
+        self._swept = int(time.monotonic() / resolution)
+
+        self.expired = 0
+        self.evicted = 0
+
+    def _advance(self, now):
+        # Sweep every wheel slot that lies fully in the past
+        tick = int(now / self.resolution)
+        self._swept = max(self._swept, tick - len(self._wheel))
+        while self._swept < tick:
+            slot = self._wheel[self._swept % len(self._wheel)]
+            for key in slot:
+                bucket = self._buckets.get(key)
+                if bucket is not None and bucket[2] <= now:
+                    del self._buckets[key]
+                    self.expired += 1
+            slot.clear()
+            self._swept += 1
+
+    def _tokens(self, bucket, now):
+        return min(self.capacity, bucket[0] + (now - bucket[1]) * self.fill_rate)
+
+    def hit(self, key):
+        # Spends one token, returns False if the key is rate limited
+        now = time.monotonic()
+        self._advance(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = self.capacity
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+        else:
+            tokens = self._tokens(bucket, now)
+            self._buckets.move_to_end(key)
+
+        if tokens < 1:
+            bucket[0], bucket[1] = tokens, now
+            return False
+
+        tokens -= 1
+        expires = now + (self.capacity - tokens) / self.fill_rate
+        self._buckets[key] = [tokens, now, expires]
+        self._wheel[int(expires / self.resolution) % len(self._wheel)].append(key)
+        return True
+
+    def retry_after(self, key):
+        # Seconds until the key may hit again
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return 0.0
+        return max(0.0, (1 - self._tokens(bucket, time.monotonic())) / self.fill_rate)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def stats(self):
+        self._advance(time.monotonic())
+        memory = sys.getsizeof(self._buckets) + sum(
+            sys.getsizeof(key) + sys.getsizeof(bucket) + sum(map(sys.getsizeof, bucket))
+            for key, bucket in self._buckets.items()
+        )
+        memory += sum(sys.getsizeof(slot) for slot in self._wheel)
+        return {
+            "keys": len(self._buckets),
+            "max_keys": self.max_keys,
+            "memory_bytes": memory,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
@@ -0,0 +1,72 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Runs CPU-bound card rendering off the event loop. Worker processes are used
+# when the platform supports them, threads otherwise. Jobs must only take and
+# return plain data so they can be pickled to a worker process. At most
+# `workers + max_queue` jobs are handed to the executor at once, later
+# callers wait for a free slot.
+class RenderPool:
+    def __init__(self, workers=2, max_queue=16, use_processes=True, initializer=None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self.initializer = initializer
+        self._slots = asyncio.Semaphore(workers + max_queue)
+        self._executor = None
+        self.mode = None
+        self.in_flight = 0  # Jobs running or queued in the executor
+
+    def _start(self):
+        if self.use_processes:
+            try:
+                # spawn keeps the workers free of the bot's threads and sockets
+                self._executor = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.initializer
+                )
+                self.mode = "process"
+                return
+            except (OSError, NotImplementedError, ImportError) as e:
+                print(f"Render process pool unavailable, using threads: {e}")
+                self.use_processes = False
+
+        self._executor = ThreadPoolExecutor(
+            self.workers,
+            thread_name_prefix="render",
+            initializer=self.initializer
+        )
+        self.mode = "thread"
+
+    async def run(self, fn, *args):
+        async with self._slots:
+            if self._executor is None:
+                self._start()
+
+            loop = asyncio.get_running_loop()
+            executor = self._executor
+            self.in_flight += 1
+            try:
+                return await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool as e:
+                # A worker died or processes can't run here, stay on threads
+                if self._executor is executor:
+                    print(f"Render process pool broke, using threads: {e}")
+                    executor.shutdown(wait=False)
+                    self.use_processes = False
+                    self._start()
+                return await loop.run_in_executor(self._executor, fn, *args)
+            finally:
+                self.in_flight -= 1
+
+    def restart(self):
+        # Workers are started again, with a fresh initializer run, on next use
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
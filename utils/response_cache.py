@@ -0,0 +1,100 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+# Prompts that differ only in case or spacing get the same answer
+def normalize_prompt(prompt):
+    return " ".join(prompt.casefold().split())
+
+# AI replies keyed by normalized prompt, in an LRU with a TTL. Identical
+# prompts that arrive while the first is still waiting on the API share its
+# request instead of starting their own. Each entry remembers how long the
+# upstream call took so hits can report the time they saved.
+class ResponseCache:
+    def __init__(self, max_entries=1000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._replies = OrderedDict()  # key -> (reply, stored_at, fetch_seconds)
+        self._inflight = {}  # key -> future of the reply being fetched
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.saved = 0.0
+
+    def get(self, key):
+        entry = self._replies.get(key)
+        if entry is None:
+            return None
+        reply, stored_at, fetch_seconds = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._replies[key]
+            return None
+
+        self._replies.move_to_end(key)
+        self.hits += 1
+        self.saved += fetch_seconds
+        return reply
+
+    def put(self, key, reply, fetch_seconds):
+        self._replies.pop(key, None)
+        self._replies[key] = (reply, time.monotonic(), fetch_seconds)
+        while len(self._replies) > self.max_entries:
+            self._replies.popitem(last=False)
+
+    async def get_or_fetch(self, key, fetch):
+        # Returns (reply, fetched), fetched is False when the reply came from
+        # the cache or from another caller's request for the same prompt
+        while True:
+            reply = self.get(key)
+            if reply is not None:
+                return reply, False
+
+            future = self._inflight.get(key)
+            if future is None:
+                break
+
+            start = time.monotonic()
+            result = await asyncio.shield(future)
+            if result is None:
+                # The caller making the request was cancelled, the first
+                # waiter to get here makes it again
+                continue
+            reply, fetch_seconds = result
+            self.coalesced += 1
+            self.saved += max(0.0, fetch_seconds - (time.monotonic() - start))
+            return reply, False
+
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        self.misses += 1
+        start = time.monotonic()
+        try:
+            reply = await fetch()
+        except asyncio.CancelledError:
+            future.set_result(None)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Nobody may be waiting, don't warn about it
+            raise
+        else:
+            fetch_seconds = time.monotonic() - start
+            self.put(key, reply, fetch_seconds)
+            future.set_result((reply, fetch_seconds))
+            return reply, True
+        finally:
+            del self._inflight[key]
+
+    def clear(self):
+        self._replies.clear()
+
+    def stats(self):
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "entries": len(self._replies),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "saved_seconds": self.saved
+        }
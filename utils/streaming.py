@@ -0,0 +1,60 @@
+import time
+
+# Discord's message length limit
+MESSAGE_LIMIT = 2000
+
+# Shows a reply while it is still being generated. The first text is posted
+# as soon as it arrives, later text is added by editing that message at most
+# once per edit_interval, and once a message is full the rest continues in a
+# new one.
+class StreamingReply:
+    def __init__(self, message, edit_interval=1.0, limit=MESSAGE_LIMIT):
+        self.message = message  # Message being replied to
+        self.edit_interval = edit_interval
+        self.limit = limit
+        self.sent = []  # Our reply messages, the last one still growing
+        self.text = ""  # Text of the last message, including what isn't shown yet
+        self.shown = ""
+        self.last_edit = 0.0
+        self.edits = 0
+
+    async def feed(self, text):
+        self.text += text
+        while len(self.text) > self.limit:
+            cut = self._split_point()
+            self.text, rest = self.text[:cut], self.text[cut:].lstrip()
+            await self._show(self.text)
+            self.sent.append(None)  # Start a new message
+            self.text = rest
+
+        if not self.text.strip():
+            return
+        if not self.sent or self.sent[-1] is None or time.monotonic() - self.last_edit >= self.edit_interval:
+            await self._show(self.text)
+
+    async def finish(self):
+        # Show whatever is still only buffered, returns False if nothing was sent
+        if self.text.strip() and self.text != self.shown:
+            await self._show(self.text)
+        return bool(self.sent)
+
+    def _split_point(self):
+        # Prefer breaking on a line or word near the limit
+        for separator in ("\n", " "):
+            cut = self.text.rfind(separator, self.limit - 200, self.limit)
+            if cut > 0:
+                return cut
+        return self.limit
+
+    async def _show(self, text):
+        if not self.sent or self.sent[-1] is None:
+            reply = await self.message.reply(text)
+            if self.sent:
+                self.sent[-1] = reply
+            else:
+                self.sent.append(reply)
+        elif text != self.shown:
+            await self.sent[-1].edit(content=text)
+            self.edits += 1
+        self.shown = text
+        self.last_edit = time.monotonic()
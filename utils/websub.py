@@ -0,0 +1,176 @@
+import asyncio
+import hmac
+import time
+import xml.etree.ElementTree as ET
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+from aiohttp import web
+
+from utils.youtube_feed import parse_feed
+
+# Topic YouTube's hub publishes a channel's uploads under
+TOPIC_URL = "https://www.youtube.com/xml/feeds/videos.xml?channel_id={}"
+
+def channel_from_topic(topic):
+    return parse_qs(urlparse(topic).query).get("channel_id", [None])[0]
+
+def sign(secret, body, method="sha1"):
+    # X-Hub-Signature value a hub sends with body
+    return f"{method}={hmac.new(secret.encode(), body, method).hexdigest()}"
+
+class Lease:
+    __slots__ = ("expires", "requested")
+
+    def __init__(self):
+        self.expires = 0.0
+        self.requested = 0.0
+
+# Receives upload notifications pushed by a WebSub hub. subscribe() asks the
+# hub to push a channel's feed to callback_url, the hub then confirms with a
+# GET carrying a challenge that is only echoed for topics we asked for, and
+# from then on POSTs feed updates signed with the shared secret until the
+# lease runs out. Verified feeds are handed to on_feed(parser).
+class WebSubReceiver:
+    SIGNATURE_METHODS = ("sha1", "sha256", "sha384", "sha512")
+
+    def __init__(self, session, hub_url, callback_url, secret, on_feed,
+                 lease_seconds=432000, renew_before=86400, retry_after=600):
+        self.session = session
+        self.hub_url = hub_url
+        self.callback_url = callback_url
+        self.secret = secret
+        self.on_feed = on_feed
+        self.lease_seconds = lease_seconds
+        self.renew_before = renew_before
+        self.retry_after = retry_after  # Seconds before an unconfirmed subscribe is sent again
+        self._leases = {}  # channel_id -> Lease
+        self._tasks = set()
+        self._runner = None
+        self.notifications = 0
+        self.rejected = 0
+        self.verified = 0
+        self.denied = 0
+
+    def make_app(self):
+        app = web.Application()
+        path = urlparse(self.callback_url).path or "/"
+        app.router.add_get(path, self.handle_verify)
+        app.router.add_post(path, self.handle_notify)
+        return app
+
+    async def start(self, host, port):
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def active(self, channel_id):
+        lease = self._leases.get(channel_id)
+        return bool(lease and lease.expires > time.time())
+
+    def needs_renewal(self, channel_id):
+        lease = self._leases.get(channel_id)
+        now = time.time()
+        if lease is None:
+            return True
+        if now - lease.requested < self.retry_after:
+            return False  # Still waiting for the hub to confirm
+        return lease.expires - now < self.renew_before
+
+    async def subscribe(self, channel_id):
+        self._leases.setdefault(channel_id, Lease()).requested = time.time()
+        await self._request("subscribe", channel_id, {
+            "hub.lease_seconds": str(self.lease_seconds),
+            "hub.secret": self.secret
+        })
+
+    async def unsubscribe(self, channel_id):
+        self._leases.pop(channel_id, None)
+        await self._request("unsubscribe", channel_id, {})
+
+    async def _request(self, mode, channel_id, extra):
+        data = {
+            "hub.callback": self.callback_url,
+            "hub.mode": mode,
+            "hub.topic": TOPIC_URL.format(channel_id),
+            "hub.verify": "async",
+            **extra
+        }
+        try:
+            async with self.session.post(self.hub_url, data=data) as response:
+                if response.status not in (202, 204):
+                    print(f"WebSub hub refused to {mode} {channel_id}: {response.status} {await response.text()}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error sending WebSub {mode} for {channel_id}: {type(e).__name__} {e}")
+
+    async def handle_verify(self, request):
+        mode = request.query.get("hub.mode")
+        topic = request.query.get("hub.topic", "")
+        challenge = request.query.get("hub.challenge")
+        channel_id = channel_from_topic(topic)
+        lease = self._leases.get(channel_id)
+
+        if mode == "denied":
+            print(f"WebSub hub denied subscription to {topic}: {request.query.get('hub.reason')}")
+            self.denied += 1
+            self._leases.pop(channel_id, None)
+            return web.Response()
+
+        # Only confirm what we asked for, anyone can call this endpoint
+        if mode == "subscribe" and lease is not None and challenge:
+            try:
+                lease_seconds = int(request.query.get("hub.lease_seconds", self.lease_seconds))
+            except ValueError:
+                return web.Response(status=400)
+            lease.expires = time.time() + lease_seconds
+            self.verified += 1
+            return web.Response(text=challenge)
+        if mode == "unsubscribe" and lease is None and challenge:
+            return web.Response(text=challenge)
+        return web.Response(status=404)
+
+    def _signature_valid(self, body, signature):
+        method, _, digest = (signature or "").partition("=")
+        if method not in self.SIGNATURE_METHODS:
+            return False
+        return hmac.compare_digest(hmac.new(self.secret.encode(), body, method).hexdigest(), digest)
+
+    async def handle_notify(self, request):
+        body = await request.read()
+
+        # Hubs expect a 2xx even for rejected content, so nothing is
+        # retried, the notification is just dropped
+        if not self._signature_valid(body, request.headers.get("X-Hub-Signature")):
+            self.rejected += 1
+            return web.Response(status=202)
+
+        try:
+            feed = parse_feed(body)
+        except ET.ParseError as e:
+            print(f"Unreadable WebSub notification: {e}")
+            return web.Response(status=202)
+
+        # Deleted videos arrive as notifications without entries
+        if feed.entries and self.active(feed.channel_id):
+            self.notifications += 1
+            task = asyncio.create_task(self.on_feed(feed))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return web.Response(status=204)
+
+    def stats(self):
+        now = time.time()
+        return {
+            "leases": sum(1 for lease in self._leases.values() if lease.expires > now),
+            "pending": sum(1 for lease in self._leases.values() if lease.expires <= now),
+            "verified": self.verified,
+            "denied": self.denied,
+            "notifications": self.notifications,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from sqlite3 import Error
+from utils.database import db
+
+# Write-behind buffer for the levels table. XP changes are applied to an
+# in-memory copy of each touched (guild, user) row and written back in one
+# executemany transaction, either on a timer or once enough rows are dirty.
+class XPBuffer:
+    def __init__(self, calculate_max_xp, batch_size=500):
+        self.calculate_max_xp = calculate_max_xp
+        self.batch_size = batch_size
+        self._entries = {}  # (guild_id, user_id) -> [xp, level, last_message]
+        self._dirty = set()
+        self._lock = asyncio.Lock()
+        self._flush_task = None
+        self.listeners = []  # Called as fn(guild_id, user_id, xp, level) on every change
+
+    async def _fetch(self, guild_id, user_id):
+        return await db.fetchone("""
+            SELECT xp, level, last_message FROM levels
+            WHERE user_id=? AND guild_id=?
+        """, (user_id, guild_id))
+
+    async def get(self, guild_id, user_id):
+        # Returns (xp, level), or None if the user has no XP yet
+        entry = self._entries.get((guild_id, user_id))
+        if entry is None:
+            entry = await self._fetch(guild_id, user_id)
+            if entry is None:
+                return None
+        return entry[0], entry[1]
+
+    async def update(self, guild_id, user_id, fn):
+        # Applies fn(xp, level) -> (xp, level) to the buffered row
+        key = (guild_id, user_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            row = await self._fetch(guild_id, user_id)
+            # Another update may have loaded the row while we were waiting
+            entry = self._entries.setdefault(key, list(row) if row else [0, 1, None])
+
+        entry[0], entry[1] = fn(entry[0], entry[1])
+        entry[2] = int(time.time())
+        self._dirty.add(key)
+
+        for listener in self.listeners:
+            listener(guild_id, user_id, entry[0], entry[1])
+
+        if len(self._dirty) >= self.batch_size and not self._flush_task:
+            self._flush_task = asyncio.create_task(self.flush())
+
+        return entry[0], entry[1]
+
+    async def add_xp(self, guild_id, user_id, amount):
+        # Returns (old_level, new_level, xp) after applying any level-ups
+        old_level = None
+
+        def apply(xp, level):
+            nonlocal old_level
+            old_level = level
+            xp += amount
+            max_xp = self.calculate_max_xp(level)
+            while xp >= max_xp:
+                xp -= max_xp
+                level += 1
+                max_xp = self.calculate_max_xp(level)
+            return xp, level
+
+        xp, level = await self.update(guild_id, user_id, apply)
+        return old_level, level, xp
+
+    def buffered(self, guild_id):
+        # Rows of one guild that may be newer than the database
+        return {
+            user_id: (entry[0], entry[1])
+            for (entry_guild, user_id), entry in self._entries.items()
+            if entry_guild == guild_id
+        }
+
+    @property
+    def pending(self):
+        return len(self._dirty)
+
+    async def flush(self):
+        async with self._lock:
+            if self._flush_task is asyncio.current_task():
+                self._flush_task = None
+
+            if not self._dirty:
+                return 0
+
+            keys, self._dirty = self._dirty, set()
+            rows = [
+                (user_id, guild_id, *self._entries[(guild_id, user_id)])
+                for guild_id, user_id in keys
+            ]
+
+            try:
+                await db.executemany("""
+                    INSERT OR REPLACE INTO levels (user_id, guild_id, xp, level, last_message)
+                    VALUES (?, ?, ?, ?, ?)
+                """, rows)
+            except Error as e:
+                print(f"Error flushing XP buffer: {e}")
+                self._dirty |= keys
+                return 0
+
+            # Rows that changed again while we were writing stay buffered
+            for key in keys - self._dirty:
+                del self._entries[key]
+
+            return len(rows)
@@ -0,0 +1,161 @@
+import sys
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+FEED_URL = "https://www.youtube.com/feeds/videos.xml?channel_id={}"
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+YT = "{http://www.youtube.com/xml/schemas/2015}"
+MEDIA = "{http://search.yahoo.com/mrss/}"
+
+class FeedEntry(NamedTuple):
+    video_id: str
+    title: str
+    url: str
+    published: Optional[str] = None  # ISO 8601 from feeds, YYYYMMDD from yt-dlp
+    thumbnail: Optional[str] = None
+
+def published_timestamp(published):
+    # Unix time of an entry's published value, None when there is none
+    if not published:
+        return None
+    if len(published) == 8:
+        return datetime.strptime(published, '%Y%m%d').replace(tzinfo=timezone.utc).timestamp()
+    return datetime.fromisoformat(published).timestamp()
+
+def _entry(element):
+    video_id = element.findtext(YT + "videoId")
+    link = element.find(ATOM + "link[@rel='alternate']")
+    thumbnail = element.find(f"{MEDIA}group/{MEDIA}thumbnail")
+    return FeedEntry(
+        video_id=video_id,
+        title=element.findtext(ATOM + "title", ""),
+        url=link.get("href") if link is not None else f"https://www.youtube.com/watch?v={video_id}",
+        published=element.findtext(ATOM + "published"),
+        thumbnail=thumbnail.get("url") if thumbnail is not None else None
+    )
+
+# Parses a channel's Atom feed as it arrives. Feeds list the newest upload
+# first, so once the last announced video shows up everything after it is
+# old and the rest of the document is skipped, unless history is set to
+# also collect the upload times of the older entries.
+class FeedParser:
+    def __init__(self, last_video_id=None, history=False):
+        self.last_video_id = last_video_id
+        self.history = history
+        self.title = None  # Channel name
+        self.channel_id = None
+        self.entries = []  # Newer than last_video_id, newest first
+        self.published = []  # Upload times of every entry parsed
+        self.found = False
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._in_entry = False
+
+    def feed(self, data):
+        if self.found and not self.history:
+            return
+        self._parser.feed(data)
+        for event, element in self._parser.read_events():
+            if element.tag != ATOM + "entry":
+                if event == "end" and element.tag == ATOM + "title" and not self._in_entry and self.title is None:
+                    self.title = element.text
+                elif event == "end" and element.tag == YT + "channelId" and self.channel_id is None:
+                    self.channel_id = element.text
+                continue
+
+            self._in_entry = event == "start"
+            if event == "start":
+                continue
+
+            entry = _entry(element)
+            element.clear()
+            timestamp = published_timestamp(entry.published)
+            if timestamp:
+                self.published.append(timestamp)
+
+            if self.found:
+                continue
+            if entry.video_id == self.last_video_id:
+                self.found = True
+                if not self.history:
+                    return
+                continue
+            self.entries.append(entry)
+
+    def close(self):
+        if not self.found or self.history:
+            self._parser.close()
+
+    def new_entries(self):
+        # When the last announced video isn't in the feed anymore (deleted,
+        # or more uploads than the feed lists) there's no telling which
+        # entries are new, so only the latest one is
+        return self.entries if self.found else self.entries[:1]
+
+def parse_feed(data, last_video_id=None, history=False):
+    # data is the whole document or an iterable of chunks of it
+    parser = FeedParser(last_video_id, history)
+    for chunk in [data] if isinstance(data, (bytes, str)) else data:
+        parser.feed(chunk)
+    parser.close()
+    return parser
+
+def entries_from_info(info, last_video_id=None):
+    # The same result from a yt-dlp flat extraction of the channel's videos
+    entries = []
+    for item in info.get("entries") or []:
+        if item.get("id") == last_video_id:
+            return entries
+        thumbnails = item.get("thumbnails") or []
+        entries.append(FeedEntry(
+            video_id=item["id"],
+            title=item.get("title", ""),
+            url=item.get("url") or f"https://www.youtube.com/watch?v={item['id']}",
+            published=item.get("upload_date"),
+            thumbnail=item.get("thumbnail") or (thumbnails[-1].get("url") if thumbnails else None)
+        ))
+    return entries[:1]
+
+# Fetches feeds over a shared aiohttp session. The ETag and Last-Modified
+# of every feed are sent back on the next request, so a channel without
+# new uploads costs a bodiless 304.
+class FeedClient:
+    def __init__(self, session, chunk_size=8192):
+        self.session = session
+        self.chunk_size = chunk_size
+        self._validators = {}  # channel_id -> (etag, last_modified)
+
+    async def fetch(self, channel_id, last_video_id=None, history=False):
+        # Returns a FeedParser, or None when the feed hasn't changed
+        headers = {}
+        etag, last_modified = self._validators.get(channel_id, (None, None))
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        async with self.session.get(FEED_URL.format(channel_id), headers=headers) as response:
+            if response.status == 304:
+                return None
+            response.raise_for_status()
+
+            parser = FeedParser(last_video_id, history)
+            # Keep reading after the parser is done so the connection can be reused
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                parser.feed(chunk)
+            parser.close()
+
+            self._validators[channel_id] = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            return parser
+
+    def forget(self, channel_id):
+        self._validators.pop(channel_id, None)
+
+# Parse a saved feed: python -m utils.youtube_feed feed.xml [last_video_id]
+if __name__ == "__main__":
+    with open(sys.argv[1], "rb") as f:
+        result = parse_feed(f, sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"{result.title}: {len(result.new_entries())} new (last video {'found' if result.found else 'not found'})")
+    for entry in result.new_entries():
+        print(f"  {entry.published} {entry.video_id} {entry.title}")
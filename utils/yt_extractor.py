@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import yt_dlp
+
+# Runs yt-dlp extraction on a small pool of worker threads so its blocking
+# network and parsing work never stalls the event loop. Each worker keeps
+# its own YoutubeDL instance, and callers stop waiting after timeout seconds.
+# A thread can't be interrupted, so socket_timeout makes yt-dlp itself give
+# up on a stuck connection and hand the worker back.
+class ExtractorPool:
+    def __init__(self, workers=4, timeout=60, options=None):
+        self.timeout = timeout
+        self.options = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': True,
+            'socket_timeout': max(1, timeout // 2),
+            **(options or {})
+        }
+        self._local = threading.local()
+        # Held until the thread is done, not until the caller gives up, so
+        # the timeout only counts time spent on a worker
+        self._slots = asyncio.Semaphore(workers)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="yt-dlp")
+
+    def _extract(self, url):
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            ydl = self._local.ydl = yt_dlp.YoutubeDL(self.options)
+        return ydl.extract_info(url, download=False)
+
+    def _done(self, future):
+        self._slots.release()
+        # Retrieve errors of calls nobody waits for anymore
+        if not future.cancelled():
+            future.exception()
+
+    async def extract(self, url):
+        # Raises asyncio.TimeoutError when the worker takes too long
+        await self._slots.acquire()
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._extract, url)
+        future.add_done_callback(self._done)
+        return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)